@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - FISCAL CALENDAR
+Sorted week-code -> quarter lookup table. Quarters start at weeks 01, 14,
+27 and 40; the short last week of a year (e.g. 202553) rolls into Q1 of
+the next year. Whole week arrays are mapped with one searchsorted pass.
+
+Week codes follow the forecast sheets, which number weeks like the
+spreadsheet WEEKNUM(date) default, not ISO: weeks start on Sunday and
+week 01 is the week holding January 1st. Every year therefore ends in a
+week 53 (Dec 28-31 in 2025, where ISO already counts 2026-W01), and a
+leap year starting on a Saturday ends in a one-day week 54.
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+
+QUARTER_START_WEEKS = (1, 14, 27, 40)
+
+
+def week_number(day):
+    """Sunday-based week of the year of a date; week 1 holds January 1st"""
+    first_sunday_offset = (date(day.year, 1, 1).weekday() + 1) % 7   # Sunday = 0
+    return (day.timetuple().tm_yday - 1 + first_sunday_offset) // 7 + 1
+
+
+def weeks_in_year(year):
+    """Number of the last week of a year: 53, or 54 for a leap year starting on Saturday"""
+    return week_number(date(year, 12, 31))
+
+
+class FiscalCalendar:
+    """Week code (YYYYWW) to quarter label ('Q3 2025') mapping"""
+
+    def __init__(self, first_year=2024, last_year=2030):
+        self._build(first_year, last_year)
+
+    def _build(self, first_year, last_year):
+        starts, labels = [], []
+        for year in range(first_year, last_year + 1):
+            for quarter, week in enumerate(QUARTER_START_WEEKS, 1):
+                starts.append(year * 100 + week)
+                labels.append(f"Q{quarter} {year}")
+            starts.append(year * 100 + 53)   # every year has a week 53 (and maybe 54)
+            labels.append(f"Q1 {year + 1}")
+        self.first_year = first_year
+        self.last_year = last_year
+        self.starts = np.array(starts, dtype=np.int64)
+        self.labels = np.array(labels, dtype=object)
+        self.last_weeks = np.array([weeks_in_year(year) for year in range(first_year, last_year + 1)])
+
+    def quarters(self, weeks):
+        """Quarter label for every week code; 'Unknown' for codes outside the calendar"""
+        weeks = np.asarray(weeks, dtype=np.int64).reshape(-1)
+        years, week_numbers = np.divmod(weeks, 100)
+        valid = (week_numbers >= 1) & (week_numbers <= 54)
+
+        # Grow the table instead of falling off the end when the calendar rolls over
+        if valid.any():
+            first_year = min(self.first_year, int(years[valid].min()))
+            last_year = max(self.last_year, int(years[valid].max()))
+            if (first_year, last_year) != (self.first_year, self.last_year):
+                self._build(first_year, last_year)
+        valid[valid] = week_numbers[valid] <= self.last_weeks[years[valid] - self.first_year]
+
+        positions = np.searchsorted(self.starts, weeks, side='right') - 1
+        result = np.full(len(weeks), 'Unknown', dtype=object)
+        result[valid] = self.labels[positions[valid]]
+        return result
+
+    def quarter(self, week):
+        """Quarter label of a single week code"""
+        return self.quarters([int(week)])[0]
+
+    def week_code(self, day):
+        """YYYYWW week code of a date, numbered like the forecast sheets (see module docstring)"""
+        return day.year * 100 + week_number(day)
+
+    def current_quarter(self, run_date=None):
+        """Quarter the run date falls in"""
+        return self.quarter(self.week_code(run_date or datetime.now()))
@@ -8,9 +8,24 @@ Alternative to Apps Script for more reliable automation
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import hashlib
 import os
 import sys
 
+from fiscal_calendar import FiscalCalendar
+from forecast_cube import GapCube
+from forecast_incremental import ARROW_AVAILABLE as INCREMENTAL_AVAILABLE, IncrementalState
+from forecast_loader import OPENPYXL_AVAILABLE, PYARROW_AVAILABLE as CACHE_AVAILABLE
+from forecast_loader import SheetCache, load_wide_sheets, load_wide_sheets_cached, read_excel_sheets, read_wide_csv
+from forecast_matrix import ForecastMatrix, densify_tall, find_week_columns
+from forecast_parallel import parallel_tall
+from forecast_pivot import join_comments, quarter_pivot, read_comments, save_pivot
+from forecast_sheets import BulkUploader, a1_range
+from forecast_snapshot import SNAPSHOT_EXTENSION, open_snapshot, write_snapshot
+from forecast_star import PARQUET_AVAILABLE as STAR_PARQUET_AVAILABLE, save_star_schema
+from forecast_summaries import GapCells
+from forecast_writer import XLSXWRITER_AVAILABLE, StreamingWorkbook
+
 # Google Sheets integration (optional)
 try:
     import gspread
@@ -20,256 +35,518 @@ except ImportError:
     GOOGLE_SHEETS_AVAILABLE = False
     print("Google Sheets integration not available. Install gspread and google-auth for full automation.")
 
+# Arrow record batches and Parquet output (optional)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from forecast_dataset import write_dataset
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Summary tabs: sheet name -> create_summaries() key
+SUMMARY_SHEETS = [('SKU_Summary', 'sku_summary'), ('Customer_Summary', 'customer_summary'),
+                  ('Weekly_Trends', 'weekly_trends'), ('PDT_Summary', 'pdt_summary')]
+
+LOOKER_SHEET = 'Looker_Ready_View_Python'   # Google Sheets tab of the Looker view
+
 class ForecastAutomation:
-    def __init__(self, excel_file_path):
+    def __init__(self, excel_file_path, run_date=None, sparse=False):
         self.excel_file = excel_file_path
+        self.sparse = sparse  # Leave zero/zero helper-week cells out of the tall view
+        self.calendar = FiscalCalendar()
+        self.run_date = run_date or datetime.now()
         self.data = {}
+        self.data_quality = {}
+        self.load_error = None  # exception of the last failed load_data / load_csv
+        self.matrix = None
+        self.sparse_metadata = None
+        self.changed_rows = None  # helpers changed since the last transform_incremental run
+        self.output_version = 0  # bumped whenever the tall view changes
+        self._derived = {}       # name -> (output_version, gap view / summaries / stats)
         self.output_data = None
         
-    def load_data(self):
-        """Load data from Excel file"""
+    def load_data(self, fast=True, cache_dir='.forecast_cache'):
+        """Load data from Excel file
+        
+        fast=True opens the workbook once in streaming read-only mode and
+        reads only the identity, price and week columns (see forecast_loader);
+        fast=False uses pd.read_excel on each sheet. Sheets and columns are
+        resolved by header (see forecast_schema). Parsed sheets are cached
+        in cache_dir keyed by the workbook contents (None disables the cache).
+        """
         print(f"Loading data from {self.excel_file}")
         
         # Load the wide format sheets
         try:
-            self.data['constrained'] = pd.read_excel(self.excel_file, sheet_name='Constrained Wide')
-            self.data['unconstrained'] = pd.read_excel(self.excel_file, sheet_name='Unconstrained Wide')
+            fast = fast and OPENPYXL_AVAILABLE and self.excel_file.lower().endswith(('.xlsx', '.xlsm'))
+            if cache_dir and CACHE_AVAILABLE:
+                frames = load_wide_sheets_cached(self.excel_file, SheetCache(cache_dir), fast)
+            elif fast:
+                frames = load_wide_sheets(self.excel_file)
+            else:
+                frames = read_excel_sheets(self.excel_file)
+            self.data['constrained'] = frames['constrained']
+            self.data['unconstrained'] = frames['unconstrained']
+            self._inputs_changed()
             print(f"✓ Loaded Constrained Wide: {self.data['constrained'].shape}")
             print(f"✓ Loaded Unconstrained Wide: {self.data['unconstrained'].shape}")
         except Exception as e:
             print(f"Error loading data: {e}")
+            self.load_error = e
             return False
             
         return True
     
+    def load_csv(self, constrained_csv, unconstrained_csv, error_value=0.0):
+        """Load the wide sheets from CSV exports instead of the Excel workbook
+        
+        Currency strings ('$5,460.00') are parsed and spreadsheet errors
+        ('#N/A', '#DIV/0!') become error_value, column by column. Counts of
+        cleaned and invalid values are kept in self.data_quality.
+        """
+        print(f"Loading data from {constrained_csv} and {unconstrained_csv}")
+        try:
+            self.data['constrained'], self.data_quality['constrained'] = read_wide_csv(constrained_csv, error_value)
+            self.data['unconstrained'], self.data_quality['unconstrained'] = read_wide_csv(unconstrained_csv, error_value)
+            self._inputs_changed()
+            print(f"✓ Loaded Constrained Wide: {self.data['constrained'].shape}")
+            print(f"✓ Loaded Unconstrained Wide: {self.data['unconstrained'].shape}")
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            self.load_error = e
+            return False
+        
+        invalid = sum(quality['invalid'] for quality in self.data_quality.values())
+        if invalid:
+            print(f"⚠️ {invalid} values could not be parsed and were treated as blank")
+        return True
+    
     def get_quarter(self, week):
         """Convert week number to quarter"""
-        week = int(week)
-        if 202529 <= week <= 202539:
-            return 'Q3 2025'
-        elif 202540 <= week <= 202552:
-            return 'Q4 2025'
-        elif 202553 <= week <= 202605:
-            return 'Q1 2026'
-        else:
-            return 'Unknown'
+        return self.calendar.quarter(week)
+    
+    def current_quarter(self):
+        """Quarter of the run date, used for IsCurrentQ"""
+        return self.calendar.current_quarter(self.run_date)
+    
+    def find_week_columns(self, df):
+        """Return the week columns (format: 202xxx) of a wide sheet"""
+        return find_week_columns(df)
+    
+    def get_price_column(self, df):
+        """Handle different sell-in price column names between sheets"""
+        return 'Sell-in Price' if 'Sell-in Price' in df.columns else 'Sell-in price'
     
     def transform_to_tall(self):
-        """Transform wide format data to tall format"""
-        print("Transforming data from wide to tall format...")
+        """Transform wide format data to tall format
         
-        # Identify week columns (format: 202xxx)
-        constrained_df = self.data['constrained']
-        week_columns = []
+        Builds the dense ForecastMatrix (see build_matrix) and materializes
+        the tall Looker view from it. Output matches the original row-by-row
+        loop (Constrained row followed by Unconstrained row for each
+        helper/week, in sheet order).
+        """
+        self.build_matrix()
+        print(f"✓ Transformation complete! Created {self.record_count()} records")
+        
+        return self.output_data
+    
+    def build_matrix(self):
+        """Build the dense helper x week representation of both forecasts
         
-        for col in constrained_df.columns:
-            col_str = str(col)
-            if col_str.isdigit() and col_str.startswith('202') and len(col_str) == 6:
-                week_columns.append(col)  # Keep original column type (int or str)
+        Clears the tall view; it is rebuilt from the matrix the next time
+        output_data is read, or streamed in chunks by the writers.
+        """
+        print("Transforming data from wide to tall format...")
+        constrained_df = self.data['constrained']
+        week_columns = self.find_week_columns(constrained_df)
         
         print(f"Found {len(week_columns)} week columns: {week_columns[:5]}..." if len(week_columns) > 5 else week_columns)
         
         if not week_columns:
             raise ValueError("No week columns found. Expected columns with format 202xxx")
         
-        # Create unconstrained lookup for fast access
-        unconstrained_lookup = {}
-        unconstrained_df = self.data['unconstrained']
+        matrix = ForecastMatrix.from_wide(constrained_df, self.data['unconstrained'],
+                                          week_columns, self.get_price_column)
         
-        for _, row in unconstrained_df.iterrows():
-            helper = str(row.iloc[0])  # Helper column
-            # Handle different column names between sheets
-            sell_in_price_col = 'Sell-in Price' if 'Sell-in Price' in unconstrained_df.columns else 'Sell-in price'
-            sell_in_price = float(row[sell_in_price_col]) if pd.notna(row[sell_in_price_col]) else 0
-            
-            for week in week_columns:
-                if week in unconstrained_df.columns:
-                    units = float(row[week]) if pd.notna(row[week]) else 0
-                    revenue = units * sell_in_price
-                    
-                    key = f"{helper}_{str(week)}"
-                    unconstrained_lookup[key] = {
-                        'units': units,
-                        'revenue': revenue
-                    }
-        
-        print(f"Created unconstrained lookup with {len(unconstrained_lookup)} entries")
-        
-        # Transform constrained data
-        output_rows = []
-        
-        processed_rows = 0
-        for _, row in constrained_df.iterrows():
-            helper = str(row.iloc[0])
-            # Handle different column names between sheets
-            sell_in_price_col = 'Sell-in Price' if 'Sell-in Price' in constrained_df.columns else 'Sell-in price'
-            sell_in_price = float(row[sell_in_price_col]) if pd.notna(row[sell_in_price_col]) else 0
-            pct = row.iloc[2]
-            pdt = row.iloc[3]
-            customer_id = row.iloc[4]
-            customer = row.iloc[5]
-            sku = row.iloc[6]
-            sku_description = row.iloc[7]
-            
-            # Skip rows with missing essential data
-            if pd.isna(helper) or pd.isna(customer) or pd.isna(sku) or helper == 'nan':
-                continue
-                
-            processed_rows += 1
-            if processed_rows <= 3:  # Debug first few rows
-                print(f"Processing row {processed_rows}: {helper}, {customer}, {sku}")
-            
-            for week in week_columns:
-                if week in constrained_df.columns:
-                    constrained_units = float(row[week]) if pd.notna(row[week]) else 0
-                    constrained_revenue = constrained_units * sell_in_price
-                    
-                    # Look up unconstrained data
-                    key = f"{helper}_{str(week)}"
-                    unconstrained = unconstrained_lookup.get(key, {'units': 0, 'revenue': 0})
-                    
-                    delta_units = constrained_units - unconstrained['units']
-                    delta_revenue = constrained_revenue - unconstrained['revenue']
-                    
-                    quarter = self.get_quarter(int(week))
-                    is_current_q = quarter == 'Q4 2025'
-                    gap_flag = 'Supply Gap' if delta_units < 0 else ''
-                    
-                    # Add constrained row
-                    output_rows.append({
-                        'Customer': customer,
-                        'Anker SKU': sku,
-                        'PDT': pdt,
-                        'Forecast Type': 'Constrained',
-                        'Quarter': quarter,
-                        'Week': int(week),
-                        'Forecast - Units': constrained_units,
-                        'Forecast Revenue': constrained_revenue,
-                        'Delta Units': delta_units,
-                        'Delta - Revenue': delta_revenue,
-                        'Gap Flag': gap_flag,
-                        'IsCurrentQ': is_current_q,
-                        'Helper': helper,
-                        'Sell-In Price': sell_in_price
-                    })
-                    
-                    # Add unconstrained row
-                    output_rows.append({
-                        'Customer': customer,
-                        'Anker SKU': sku,
-                        'PDT': pdt,
-                        'Forecast Type': 'Unconstrained',
-                        'Quarter': quarter,
-                        'Week': int(week),
-                        'Forecast - Units': unconstrained['units'],
-                        'Forecast Revenue': unconstrained['revenue'],
-                        'Delta Units': 0,  # Delta is 0 for unconstrained (baseline)
-                        'Delta - Revenue': 0,
-                        'Gap Flag': '',
-                        'IsCurrentQ': is_current_q,
-                        'Helper': helper,
-                        'Sell-In Price': sell_in_price
-                    })
-        
-        self.output_data = pd.DataFrame(output_rows)
-        print(f"✓ Processed {processed_rows} data rows")
-        print(f"✓ Transformation complete! Created {len(self.output_data)} records")
+        n_rows, n_weeks = matrix.shape
+        for i in range(min(3, n_rows)):  # Debug first few rows
+            print(f"Processing row {i + 1}: {matrix.helpers[i]}, "
+                  f"{matrix.values('Customer')[i]}, {matrix.values('Anker SKU')[i]}")
+        print(f"✓ Processed {n_rows} data rows")
+        return self._set_matrix(matrix)
+    
+    def _inputs_changed(self):
+        """New wide sheets: drop the matrix, tall view and everything derived from the old ones"""
+        self.matrix = None
+        self.sparse_metadata = None
+        self._output_data = None
+        self._invalidate()
+    
+    def _set_matrix(self, matrix):
+        """Use matrix as the forecast source, clearing the tall view built from the previous one"""
+        self.matrix = matrix
+        self._output_data = None
+        self._invalidate()
+        
+        n_rows, n_weeks = self.matrix.shape
+        print(f"✓ Forecast matrix: {n_rows} helpers x {n_weeks} weeks ({self.matrix.nbytes / 1e6:.1f} MB)")
+        
+        self.sparse_metadata = None
+        if self.sparse:
+            dense_records = n_rows * n_weeks * 2
+            sparse_records = len(self.get_sparse_metadata()['cells']) * 2
+            ratio = dense_records / sparse_records if sparse_records else float('inf')
+            print(f"✓ Sparse output: {sparse_records:,} of {dense_records:,} records kept ({ratio:.1f}x compression)")
+        
+        return self.matrix
+    
+    def save_snapshot(self, snapshot_file=None):
+        """Save the forecast matrix as a memory-mappable snapshot (see forecast_snapshot)
+        
+        Defaults to the workbook name with the .fcsnap extension.
+        """
+        if self.matrix is None:
+            raise ValueError("No forecast matrix available. Run build_matrix() first.")
+        snapshot_file = snapshot_file or os.path.splitext(self.excel_file)[0] + SNAPSHOT_EXTENSION
+        write_snapshot(self.matrix, snapshot_file, label=os.path.splitext(os.path.basename(self.excel_file))[0])
+        print(f"✓ Saved snapshot to {snapshot_file} ({os.path.getsize(snapshot_file) / 1e6:.1f} MB)")
+        return snapshot_file
+    
+    def load_snapshot(self, snapshot_file, weeks=None):
+        """Use a snapshot instead of the workbook; only the given week codes are read if set"""
+        with open_snapshot(snapshot_file) as snapshot:
+            print(f"✓ Opened snapshot {snapshot_file} ({snapshot.shape[0]} helpers x {snapshot.shape[1]} weeks)")
+            return self._set_matrix(snapshot.to_matrix(weeks))
+    
+    def transform_incremental(self, state_file='forecast_incremental_state.pkl'):
+        """Transform to tall format, re-deriving only helpers changed since the last run
+        
+        The tall view and gap cells of each run are kept with its row hashes
+        (state_file and the .arrow file beside it, see forecast_incremental);
+        the next run recomputes the changed helpers and splices them in. The
+        positions of the changed helpers are left in self.changed_rows.
+        """
+        if not INCREMENTAL_AVAILABLE:
+            raise ImportError("pyarrow is required for incremental transforms. Install pyarrow")
+        self.build_matrix()
+        tall, gaps, self.changed_rows = IncrementalState(state_file).transform(
+            self.matrix, self.week_quarters(), self.current_quarter(), self.sparse)
+        self.output_data = tall
+        self._derived['gap_cells'] = (self.output_version, gaps)
+        print(f"✓ Incremental transform: re-derived {len(self.changed_rows)} of {self.matrix.shape[0]} helpers, "
+              f"reused the rest")
+        print(f"✓ Transformation complete! Created {self.record_count()} records")
+        
+        return self.output_data
+    
+    def transform_parallel(self, workers=None):
+        """Transform to tall format with the matrix sharded by Customer ID over a process pool
+        
+        Falls back to the serial transform where the pool does not pay off
+        (see forecast_parallel.PARALLEL_MIN_CELLS).
+        """
+        self.build_matrix()
+        start = datetime.now()
+        self.output_data = parallel_tall(self.matrix, self.week_quarters(), self.current_quarter(),
+                                         workers, self.sparse)
+        seconds = (datetime.now() - start).total_seconds()
+        print(f"✓ Parallel transform: {self.record_count()} records in {seconds:.2f}s")
         
         return self.output_data
     
+    def week_quarters(self):
+        """Quarter label of each week column of the forecast matrix"""
+        return self.calendar.quarters(self.matrix.weeks)
+    
+    @property
+    def output_data(self):
+        """Tall Looker view, materialized from the forecast matrix on first use"""
+        if self._output_data is None and self.matrix is not None:
+            self._output_data = self.matrix.to_tall(self.week_quarters(), self.current_quarter(),
+                                                    sparse=self.sparse)
+        return self._output_data
+    
+    @output_data.setter
+    def output_data(self, value):
+        self._output_data = value
+        self._invalidate()
+    
+    def _invalidate(self):
+        """Start a new output version; derived artifacts are recomputed on next use"""
+        self.output_version += 1
+        self._derived = {}
+    
+    def _memoized(self, name, compute):
+        """Value of compute() for the current output version, computed once"""
+        cached = self._derived.get(name)
+        if cached is None or cached[0] != self.output_version:
+            cached = (self.output_version, compute())
+            self._derived[name] = cached
+        return cached[1]
+    
+    def has_output(self):
+        """True once there is tall data to read, without materializing it"""
+        return self._output_data is not None or self.matrix is not None
+    
+    def record_count(self):
+        """Number of tall records, without materializing them"""
+        if self._output_data is not None:
+            return len(self._output_data)
+        if self.sparse:
+            return len(self.get_sparse_metadata()['cells']) * 2
+        n_rows, n_weeks = self.matrix.shape
+        return n_rows * n_weeks * 2
+    
+    def densify_output(self):
+        """Dense tall view rebuilt from a sparse one (zero/zero cells filled back in)"""
+        if not self.sparse:
+            return self.output_data
+        return densify_tall(self.output_data, self.get_sparse_metadata())
+    
+    def get_sparse_metadata(self):
+        """Sparse metadata of the forecast matrix (see ForecastMatrix.sparse_metadata)
+        
+        Computed on first use, so it is there whenever sparse is set, even
+        if sparse was switched on after build_matrix().
+        """
+        if self.sparse_metadata is None:
+            self.sparse_metadata = self.matrix.sparse_metadata(self.week_quarters(), self.current_quarter())
+        return self.sparse_metadata
+    
+    def iter_output_chunks(self, chunk_size=100000, as_arrow=False):
+        """Yield the tall Looker view in chunks of at most ~chunk_size records
+        
+        Chunks are built straight from the forecast matrix unless the full
+        view has already been materialized, so peak memory stays bounded by
+        the chunk size. With as_arrow=True chunks are pyarrow RecordBatches.
+        """
+        if not self.has_output():
+            raise ValueError("No output data available. Run transform_to_tall() first.")
+        if as_arrow and not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Arrow record batches. Install pyarrow")
+        
+        if self._output_data is not None:
+            chunks = (self._output_data.iloc[start:start + chunk_size]
+                      for start in range(0, max(len(self._output_data), 1), chunk_size))
+        else:
+            chunks = self.matrix.iter_tall(self.week_quarters(), self.current_quarter(), chunk_size, self.sparse)
+        
+        for chunk in chunks:
+            yield pa.RecordBatch.from_pandas(chunk, preserve_index=False) if as_arrow else chunk
+    
+    def output_digest(self):
+        """Hex digest of the tall view's contents, hashed row by row (once per output version)
+        
+        Independent of the chunk size, so it identifies the data an upload
+        writes, whatever file name or record count it comes with.
+        """
+        def compute():
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(repr(self.sparse).encode())
+            for chunk in self.iter_output_chunks():
+                digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+            return digest.hexdigest()
+        return self._memoized('output_digest', compute)
+    
+    def gap_rows(self):
+        """Supply Gap rows of the tall view, collected chunk by chunk (once per output version)"""
+        def collect():
+            gap_chunks = [chunk[chunk['Gap Flag'] == 'Supply Gap'] for chunk in self.iter_output_chunks()]
+            return pd.concat(gap_chunks, ignore_index=True)
+        return self._memoized('gap_rows', collect)
+    
+    def gap_cells(self):
+        """Supply gap cells for the summaries and stats (see forecast_summaries)
+        
+        Taken from the forecast matrix; without a matrix, from the gap rows
+        of the tall view.
+        """
+        def collect():
+            if self.matrix is not None:
+                return GapCells.from_matrix(self.matrix, self.week_quarters())
+            return GapCells.from_tall(self.gap_rows())
+        return self._memoized('gap_cells', collect)
+    
     def create_summaries(self):
-        """Create summary DataFrames for dashboards"""
-        if self.output_data is None:
+        """Create summary DataFrames for dashboards
+        
+        All four summaries come from one pass over the supply gap cells and
+        are computed once per output version; writers and reports share the
+        same DataFrames, so treat them as read-only.
+        """
+        if not self.has_output():
             raise ValueError("No output data available. Run transform_to_tall() first.")
         
-        summaries = {}
-        
-        # Filter only supply gaps
-        gaps_df = self.output_data[self.output_data['Gap Flag'] == 'Supply Gap'].copy()
-        
-        # SKU Summary
-        sku_summary = gaps_df.groupby(['Anker SKU', 'PDT']).agg({
-            'Delta Units': 'sum',
-            'Delta - Revenue': 'sum',
-            'Customer': 'nunique'
-        }).reset_index()
-        sku_summary.columns = ['SKU', 'PDT', 'Gap Units', 'Revenue Impact', 'Customers Affected']
-        sku_summary['Gap Units'] = sku_summary['Gap Units'].abs()
-        sku_summary['Revenue Impact'] = sku_summary['Revenue Impact'].abs()
-        sku_summary = sku_summary.sort_values('Revenue Impact', ascending=False)
-        sku_summary.insert(0, 'Rank', range(1, len(sku_summary) + 1))
-        summaries['sku_summary'] = sku_summary
-        
-        # Customer Summary
-        customer_summary = gaps_df.groupby('Customer').agg({
-            'Delta Units': 'sum',
-            'Delta - Revenue': 'sum',
-            'Anker SKU': 'nunique'
-        }).reset_index()
-        customer_summary.columns = ['Customer', 'Gap Units', 'Revenue Impact', 'SKUs Affected']
-        customer_summary['Gap Units'] = customer_summary['Gap Units'].abs()
-        customer_summary['Revenue Impact'] = customer_summary['Revenue Impact'].abs()
-        customer_summary = customer_summary.sort_values('Revenue Impact', ascending=False)
-        customer_summary.insert(0, 'Rank', range(1, len(customer_summary) + 1))
-        summaries['customer_summary'] = customer_summary
-        
-        # Weekly Trends
-        weekly_trends = gaps_df.groupby(['Week', 'Quarter']).agg({
-            'Delta Units': 'sum',
-            'Delta - Revenue': 'sum',
-            'Customer': 'count'
-        }).reset_index()
-        weekly_trends.columns = ['Week', 'Quarter', 'Gap Units', 'Revenue Impact', 'Records Count']
-        weekly_trends['Gap Units'] = weekly_trends['Gap Units'].abs()
-        weekly_trends['Revenue Impact'] = weekly_trends['Revenue Impact'].abs()
-        weekly_trends = weekly_trends.sort_values('Week')
-        summaries['weekly_trends'] = weekly_trends
-        
-        # PDT Summary
-        pdt_summary = gaps_df.groupby('PDT').agg({
-            'Delta Units': 'sum',
-            'Delta - Revenue': 'sum',
-            'Customer': 'nunique'
-        }).reset_index()
-        pdt_summary.columns = ['PDT', 'Gap Units', 'Revenue Impact', 'Customers Affected']
-        pdt_summary['Gap Units'] = pdt_summary['Gap Units'].abs()
-        pdt_summary['Revenue Impact'] = pdt_summary['Revenue Impact'].abs()
-        pdt_summary = pdt_summary.sort_values('Revenue Impact', ascending=False)
-        summaries['pdt_summary'] = pdt_summary
-        
-        print("✓ Created summary tables:")
-        for name, df in summaries.items():
-            print(f"  - {name}: {len(df)} rows")
-        
-        return summaries
-    
-    def save_to_excel(self, output_file='forecast_analysis_output.xlsx'):
-        """Save all data to Excel file"""
-        if self.output_data is None:
+        def compute():
+            summaries = self.gap_cells().summaries()
+            print("✓ Created summary tables:")
+            for name, df in summaries.items():
+                print(f"  - {name}: {len(df)} rows")
+            return summaries
+        
+        return self._memoized('summaries', compute)
+    
+    def gap_cube(self):
+        """Supply gap cube for ad-hoc slice/dice/roll-up queries (see forecast_cube)"""
+        return self._memoized('gap_cube', lambda: GapCube.from_gap_cells(self.gap_cells()))
+    
+    def summary_stats(self):
+        """Headline supply gap statistics (computed once per output version)"""
+        def compute():
+            stats = self.gap_cells().totals()
+            stats['records'] = self.record_count()
+            return stats
+        return self._memoized('summary_stats', compute)
+    
+    def save_to_excel(self, output_file='forecast_analysis_output.xlsx', chunk_size=100000, streaming=True):
+        """Save all data to Excel file
+        
+        With xlsxwriter installed the Looker view is streamed to disk chunk
+        by chunk in constant memory (see forecast_writer); otherwise, or
+        with streaming=False, the workbook is built with openpyxl.
+        """
+        if not self.has_output():
             raise ValueError("No output data available. Run transform_to_tall() first.")
         
         summaries = self.create_summaries()
         
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            # Main data
-            self.output_data.to_excel(writer, sheet_name='Looker_Ready_View', index=False)
-            
-            # Summaries
-            summaries['sku_summary'].to_excel(writer, sheet_name='SKU_Summary', index=False)
-            summaries['customer_summary'].to_excel(writer, sheet_name='Customer_Summary', index=False)
-            summaries['weekly_trends'].to_excel(writer, sheet_name='Weekly_Trends', index=False)
-            summaries['pdt_summary'].to_excel(writer, sheet_name='PDT_Summary', index=False)
+        if streaming and XLSXWRITER_AVAILABLE:
+            with StreamingWorkbook(output_file) as workbook:
+                workbook.write_frames('Looker_Ready_View', self.iter_output_chunks(chunk_size))
+                for sheet_name, name in SUMMARY_SHEETS:
+                    workbook.write_frames(sheet_name, [summaries[name]])
+        else:
+            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+                # Main data, appended chunk by chunk below the header
+                start_row = 0
+                for chunk in self.iter_output_chunks(chunk_size):
+                    chunk.to_excel(writer, sheet_name='Looker_Ready_View', index=False,
+                                   header=start_row == 0, startrow=start_row)
+                    start_row += len(chunk) + (1 if start_row == 0 else 0)
+                
+                # Summaries
+                for sheet_name, name in SUMMARY_SHEETS:
+                    summaries[name].to_excel(writer, sheet_name=sheet_name, index=False)
         
         print(f"✓ Saved analysis to {output_file}")
         return output_file
     
-    def upload_to_google_sheets(self, spreadsheet_id, credentials_file=None):
-        """Upload data to Google Sheets (requires service account credentials)"""
+    def quarter_pivot(self, comments=None):
+        """Acct SKU Analysis pivot: SUM of Delta Units / Delta Revenue of the supply
+        gap cells by Customer / SKU / PDT and quarter, with a Grand Total
+        
+        Built from the forecast matrix (see forecast_pivot). comments is a
+        side table (DataFrame or CSV, e.g. last week's pivot export) whose
+        shortage / DP's comment columns are joined by helper key.
+        """
+        if self.matrix is None:
+            raise ValueError("No forecast matrix available. Run build_matrix() first.")
+        pivot = self._memoized('quarter_pivot', lambda: quarter_pivot(self.matrix, self.week_quarters()))
+        return join_comments(pivot, read_comments(comments) if comments is not None else None)
+    
+    def save_quarter_pivot(self, output_file='forecast_acct_sku_analysis.xlsx', comments=None):
+        """Save the quarter pivot in the Acct SKU Analysis layout (.xlsx or .csv)"""
+        return save_pivot(self.quarter_pivot(comments), output_file)
+    
+    def save_to_csv(self, output_file='forecast_analysis_output.csv', chunk_size=100000):
+        """Stream the Looker view to a CSV file"""
+        if not self.has_output():
+            raise ValueError("No output data available. Run transform_to_tall() first.")
+        
+        for i, chunk in enumerate(self.iter_output_chunks(chunk_size)):
+            chunk.to_csv(output_file, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        
+        print(f"✓ Saved Looker view to {output_file}")
+        return output_file
+    
+    def save_to_parquet(self, output_file='forecast_analysis_output.parquet', chunk_size=100000):
+        """Stream the Looker view to a Parquet file, one row group per chunk"""
+        if not PYARROW_AVAILABLE:
+            print("❌ Parquet output not available. Install pyarrow")
+            return None
+        
+        writer = None
+        try:
+            for batch in self.iter_output_chunks(chunk_size, as_arrow=True):
+                table = pa.Table.from_batches([batch])
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        print(f"✓ Saved Looker view to {output_file}")
+        return output_file
+    
+    def save_to_dataset(self, root='forecast_dataset', version=None, chunk_size=100000):
+        """Stream the Looker view into a Parquet dataset partitioned by Quarter/Week/Forecast Type
+        
+        Pass the FC version label (e.g. '25WK35') to keep every version side
+        by side in the same dataset; read slices back with
+        forecast_dataset.read_dataset().
+        """
+        if not PYARROW_AVAILABLE:
+            print("❌ Parquet output not available. Install pyarrow")
+            return None
+        
+        return write_dataset(self.iter_output_chunks(chunk_size, as_arrow=True), root, version)
+
+    def save_star_schema(self, output_dir='forecast_star', file_format=None, chunk_size=100000):
+        """Save the fact_forecast / dim_helper / dim_calendar tables (see forecast_star)
+
+        Parquet when pyarrow is installed, CSV otherwise or with file_format='csv'.
+        """
+        if self.matrix is None:
+            raise ValueError("No forecast matrix available. Run build_matrix() first.")
+        if file_format == 'parquet' and not STAR_PARQUET_AVAILABLE:
+            print("❌ Parquet output not available. Install pyarrow")
+            return None
+
+        return save_star_schema(self.matrix, self.week_quarters(), self.current_quarter(),
+                                output_dir, file_format, chunk_size, self.sparse)
+
+    def sheet_tables(self, chunk_size=20000):
+        """Google Sheets tab -> table: the Looker view (in chunks) and the summary tabs"""
+        summaries = self.create_summaries()
+        tables = {LOOKER_SHEET: self.iter_output_chunks(chunk_size)}
+        for sheet_name, name in SUMMARY_SHEETS:
+            tables[f"{sheet_name}_Python"] = summaries[name]
+        return tables
+    
+    def sheet_sizes(self, tables):
+        """(rows, columns) each tab of sheet_tables() needs, header included"""
+        sizes = {}
+        for sheet_name, table in tables.items():
+            if sheet_name == LOOKER_SHEET:
+                sizes[sheet_name] = (self.record_count() + 1, len(next(self.iter_output_chunks(1)).columns))
+            else:
+                sizes[sheet_name] = (len(table) + 1, len(table.columns))
+        return sizes
+    
+    def upload_to_google_sheets(self, spreadsheet_id, credentials_file=None, chunk_size=20000,
+                                workers=4, rate=1.0, sync=True,
+                                manifest_file='forecast_sheets_manifest.json',
+                                progress_file='forecast_upload_progress.json'):
+        """Upload the Looker view and the summary tabs to Google Sheets (requires service account credentials)
+        
+        Missing worksheets are created (and small ones grown) in one
+        structural request. With sync=True only the row blocks that changed
+        since the last sync are written, for all tabs together in batched
+        requests (hashes kept in manifest_file), and rows past the end are
+        cleared; the sheets are never emptied. With sync=False the tabs are
+        cleared and rewritten; if that fails, running it again on the same
+        data resumes the Looker view after the last chunk recorded in
+        progress_file (changed data starts over). Either way the writes are
+        size-bounded, run on a few worker threads, rate-limited to `rate`
+        requests per second and retried on 429/5xx (see forecast_sheets).
+        """
         if not GOOGLE_SHEETS_AVAILABLE:
             print("❌ Google Sheets integration not available. Install gspread and google-auth")
             return False
         
-        if self.output_data is None:
+        if not self.has_output():
             raise ValueError("No output data available. Run transform_to_tall() first.")
         
         # Set up credentials
@@ -284,53 +561,73 @@ class ForecastAutomation:
         try:
             client = gspread.authorize(creds)
             spreadsheet = client.open_by_key(spreadsheet_id)
+            uploader = BulkUploader(spreadsheet, rate=rate, workers=workers, progress_file=progress_file)
             
-            # Upload main data
-            try:
-                worksheet = spreadsheet.worksheet('Looker_Ready_View_Python')
-            except:
-                worksheet = spreadsheet.add_worksheet('Looker_Ready_View_Python', 
-                                                    rows=len(self.output_data) + 100, 
-                                                    cols=len(self.output_data.columns))
+            # Create missing tabs / grow small ones in one request
+            tables = self.sheet_tables(chunk_size)
+            created = uploader.ensure_sheets(self.sheet_sizes(tables))
+            if created:
+                print(f"✓ Created worksheets: {', '.join(created)}")
             
-            worksheet.clear()
-            worksheet.update([self.output_data.columns.values.tolist()] + self.output_data.values.tolist())
+            if sync:
+                stats = uploader.sync_tables(tables, manifest_file)
+                print(f"✓ Synced Google Sheets ({stats['tables']} tabs): {stats['changed']} of "
+                      f"{stats['blocks']} row blocks changed, {stats['cells']:,} of {stats['total_cells']:,} "
+                      f"cells written in {stats['requests']} requests ({stats['retries']} retries, "
+                      f"{stats['seconds']:.1f}s)")
+                return True
             
-            print("✓ Uploaded to Google Sheets successfully")
+            key = self.output_digest()  # resume only an upload of exactly this data
+            for sheet_name in tables:
+                uploader.forget(sheet_name, manifest_file)
+            if uploader.acknowledged(LOOKER_SHEET, key) == (0, 0):
+                uploader.call('values_batch_clear', body={'ranges': [a1_range(name) for name in tables]})
+            stats = uploader.upload(LOOKER_SHEET, tables.pop(LOOKER_SHEET), key=key)
+            summary_stats = uploader.sync_tables(tables, manifest_file)
+            print(f"✓ Uploaded to Google Sheets successfully ({stats['rows']:,} rows in "
+                  f"{stats['requests']} requests, summary tabs in {summary_stats['requests']}, "
+                  f"{stats['retries'] + summary_stats['retries']} retries)")
             return True
             
         except Exception as e:
-            print(f"❌ Error uploading to Google Sheets: {e}")
+            print(f"❌ Error uploading to Google Sheets: {e!r}")
             return False
     
     def print_summary_stats(self):
         """Print key statistics"""
-        if self.output_data is None or len(self.output_data) == 0:
+        if not self.has_output() or self.record_count() == 0:
             print("No data available")
             return
         
-        gaps_df = self.output_data[self.output_data['Gap Flag'] == 'Supply Gap']
+        stats = self.summary_stats()
         
         print("\n" + "="*50)
         print("FORECAST ANALYSIS SUMMARY")
         print("="*50)
-        print(f"Total records processed: {len(self.output_data):,}")
-        print(f"Supply gap records: {len(gaps_df):,}")
-        print(f"Total revenue at risk: ${gaps_df['Delta - Revenue'].abs().sum():,.2f}")
-        print(f"Total units at risk: {gaps_df['Delta Units'].abs().sum():,.0f}")
-        print(f"Unique SKUs affected: {gaps_df['Anker SKU'].nunique()}")
-        print(f"Unique customers affected: {gaps_df['Customer'].nunique()}")
+        print(f"Total records processed: {stats['records']:,}")
+        print(f"Supply gap records: {stats['gap_records']:,}")
+        print(f"Total revenue at risk: ${stats['revenue_at_risk']:,.2f}")
+        print(f"Total units at risk: {stats['units_at_risk']:,.0f}")
+        print(f"Unique SKUs affected: {stats['skus_affected']}")
+        print(f"Unique customers affected: {stats['customers_affected']}")
         
         # Quarter breakdown
         print("\nQuarter breakdown:")
-        quarter_summary = gaps_df.groupby('Quarter')['Delta - Revenue'].sum().abs()
-        for quarter, revenue in quarter_summary.items():
+        for quarter, revenue in stats['quarter_revenue'].items():
             print(f"  {quarter}: ${revenue:,.2f}")
 
 
 def main():
-    """Main execution function"""
-    excel_file = 'Unconstrained FCST vs Constrained FCST 25WK29 FC Version.xlsx'
+    """Main execution function
+    
+    Usage: python3 forecast_automation.py [workbook | directory | glob]
+    A directory or glob runs batch mode (see forecast_batch).
+    """
+    excel_file = sys.argv[1] if len(sys.argv) > 1 else 'Unconstrained FCST vs Constrained FCST 25WK29 FC Version.xlsx'
+    
+    if os.path.isdir(excel_file) or any(char in excel_file for char in '*?['):
+        from forecast_batch import main as batch_main
+        sys.exit(batch_main(sys.argv[1:]))
     
     if not os.path.exists(excel_file):
         print(f"❌ Excel file not found: {excel_file}")
@@ -348,7 +645,8 @@ def main():
         if not automation.load_data():
             return
         
-        automation.transform_to_tall()
+        # Tall rows are streamed from the matrix by the writers below
+        automation.build_matrix()
         automation.print_summary_stats()
         
         # Save to Excel
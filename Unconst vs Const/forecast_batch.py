@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - BATCH MODE
+Processes every forecast workbook in a directory (or matching a glob):
+workbooks are loaded in a thread pool so file reads and parsing overlap,
+each loaded workbook is handed to a process pool for the transform and its
+own Looker-ready output, and a consolidated index of all runs is written at
+the end. A failing workbook is recorded in the index without stopping the
+others.
+
+Usage:
+    python3 forecast_batch.py <directory or glob> [--output-dir DIR] [--workers N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from forecast_automation import ForecastAutomation
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+INDEX_COLUMNS = ['Input', 'Status', 'Output', 'Input MB', 'Helpers', 'Weeks', 'Records',
+                 'Gap Records', 'Revenue at Risk', 'Units at Risk', 'Load Seconds',
+                 'Transform Seconds', 'Error']
+
+
+def discover_workbooks(source):
+    """Workbook paths in a directory, or matching a glob pattern, sorted by name
+
+    Excel lock files (~$...) are skipped.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths
+                  if path.lower().endswith(WORKBOOK_EXTENSIONS)
+                  and not os.path.basename(path).startswith('~$')
+                  and os.path.isfile(path))
+
+
+def output_path(path, output_dir):
+    """Output workbook for one input ('<input name> - Looker Ready.xlsx')"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, f"{name} - Looker Ready.xlsx")
+
+
+def _load_workbook(path, fast, cache_dir):
+    """Thread worker: parsed wide sheets of one workbook"""
+    start = time.perf_counter()
+    automation = ForecastAutomation(path)
+    if not automation.load_data(fast=fast, cache_dir=cache_dir):
+        error = automation.load_error
+        raise ValueError(f"could not read forecast sheets: {error}") from error
+    return automation.data, time.perf_counter() - start
+
+
+def _transform_workbook(path, data, output_file, run_date):
+    """Process worker: transform one loaded workbook and write its output
+
+    Returns the index fields for the workbook; the worker's progress output
+    is dropped so the batch report stays readable.
+    """
+    start = time.perf_counter()
+    automation = ForecastAutomation(path, run_date=run_date)
+    automation.data = data
+    with contextlib.redirect_stdout(io.StringIO()):
+        matrix = automation.build_matrix()
+        automation.save_to_excel(output_file)
+        stats = automation.summary_stats()
+    return {
+        'Output': output_file,
+        'Helpers': matrix.shape[0],
+        'Weeks': matrix.shape[1],
+        'Records': stats['records'],
+        'Gap Records': stats['gap_records'],
+        'Revenue at Risk': stats['revenue_at_risk'],
+        'Units at Risk': stats['units_at_risk'],
+        'Transform Seconds': time.perf_counter() - start,
+    }
+
+
+def run_batch(source, output_dir='forecast_outputs', load_threads=4, workers=None,
+              fast=True, cache_dir='.forecast_cache', run_date=None):
+    """Process all workbooks found by source; returns the consolidated index DataFrame
+
+    Each workbook is submitted for transform as soon as it has loaded, so
+    loading and transforming overlap. Transform processes are started from
+    a forkserver, since forking while loader threads run is unsafe. The index (one row per input, failed
+    ones included) is saved as batch_index.csv in output_dir.
+    """
+    paths = discover_workbooks(source)
+    if not paths:
+        print(f"❌ No workbooks found for {source}")
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"🚀 Batch processing {len(paths)} workbooks from {source}")
+    start = time.perf_counter()
+    rows = {path: {'Input': path, 'Status': 'failed', 'Error': '',
+                   'Input MB': os.path.getsize(path) / 1024 / 1024} for path in paths}
+
+    with ThreadPoolExecutor(max_workers=load_threads) as loaders, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                mp_context=multiprocessing.get_context('forkserver')) as pool:
+        loads = {loaders.submit(_load_workbook, path, fast, cache_dir): path for path in paths}
+        transforms = {}
+        for future in as_completed(loads):
+            path = loads[future]
+            try:
+                data, rows[path]['Load Seconds'] = future.result()
+            except Exception as e:
+                rows[path]['Error'] = f"load: {e}"
+                print(f"❌ {os.path.basename(path)}: could not load ({e})")
+                continue
+            transform = pool.submit(_transform_workbook, path, data, output_path(path, output_dir), run_date)
+            transforms[transform] = path
+
+        for future in as_completed(transforms):
+            path = transforms[future]
+            try:
+                rows[path].update(future.result(), Status='ok')
+                print(f"✓ {os.path.basename(path)}: {rows[path]['Records']:,} records, "
+                      f"{rows[path]['Gap Records']:,} gap records")
+            except Exception as e:
+                rows[path]['Error'] = f"transform: {e}"
+                print(f"❌ {os.path.basename(path)}: transform failed ({e})")
+
+    index = pd.DataFrame([rows[path] for path in paths]).reindex(columns=INDEX_COLUMNS)
+    index_file = os.path.join(output_dir, 'batch_index.csv')
+    index.to_csv(index_file, index=False)
+
+    elapsed = time.perf_counter() - start
+    succeeded = index[index['Status'] == 'ok']
+    print("\n" + "="*50)
+    print("BATCH THROUGHPUT")
+    print("="*50)
+    print(f"Workbooks: {len(succeeded)} ok, {len(index) - len(succeeded)} failed")
+    print(f"Wall time: {elapsed:.2f}s")
+    print(f"Throughput: {len(succeeded) / elapsed:.2f} workbooks/s, "
+          f"{succeeded['Input MB'].sum() / elapsed:.2f} MB/s, "
+          f"{succeeded['Records'].sum() / elapsed:,.0f} records/s")
+    print(f"Load time (sum): {index['Load Seconds'].sum():.2f}s, "
+          f"transform time (sum): {index['Transform Seconds'].sum():.2f}s")
+    print(f"📊 Index saved to: {index_file}")
+    return index
+
+
+def main(argv=None):
+    """Batch-process the workbooks given on the command line"""
+    parser = argparse.ArgumentParser(description="Process many forecast workbooks at once")
+    parser.add_argument('source', help="directory or glob of forecast workbooks")
+    parser.add_argument('--output-dir', default='forecast_outputs')
+    parser.add_argument('--threads', type=int, default=4, help="workbooks loaded at once")
+    parser.add_argument('--workers', type=int, default=None, help="transform processes (default: CPU count)")
+    parser.add_argument('--no-cache', action='store_true', help="do not use the parsed sheet cache")
+    args = parser.parse_args(argv)
+
+    try:
+        index = run_batch(args.source, args.output_dir, args.threads, args.workers,
+                          cache_dir=None if args.no_cache else '.forecast_cache')
+    except Exception as e:
+        print(f"❌ Error during batch run: {e}")
+        traceback.print_exc()
+        return 1
+    return 0 if len(index) and (index['Status'] == 'ok').all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
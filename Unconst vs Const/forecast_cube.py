@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - SUPPLY GAP CUBE
+Pre-aggregated supply gap measures over Customer x Anker SKU x PDT x
+Quarter x Week for ad-hoc slice / dice / roll-up questions. The finest
+aggregate is built once from the gap cells; coarser aggregates are
+materialized from it, and every query is answered from the smallest
+materialized aggregate that still holds the dimensions it needs, instead of
+rescanning the Looker view.
+
+    cube = automation.gap_cube()
+    cube.query(by='PDT')                                          # roll-up
+    cube.query(by=['Customer'], where={'Quarter': 'Q4 2025'})     # slice
+    cube.query(by=['PDT', 'Week'], where={'Customer': ['Best Buy', 'Walmart']})  # dice
+"""
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ('Customer', 'Anker SKU', 'PDT', 'Quarter', 'Week')
+
+MEASURES = ('Gap Units', 'Revenue Impact', 'Gap Records', 'Customers Affected', 'SKUs Affected')
+
+# Distinct-count measures and the dimension they count; an aggregate can
+# only answer them if it still holds that dimension
+DISTINCT_MEASURES = {'Customers Affected': 'Customer', 'SKUs Affected': 'Anker SKU'}
+
+DEFAULT_AGGREGATES = (
+    ('Customer', 'Anker SKU', 'PDT', 'Quarter'),
+    ('Customer', 'PDT', 'Quarter', 'Week'),
+    ('PDT', 'Quarter', 'Week'),
+    ('Customer', 'Quarter'),
+)
+
+
+def _sorted_categories(codes, categories):
+    """Re-code so that code order follows the sorted category values"""
+    categories = np.asarray(categories, dtype=object)
+    try:
+        order = pd.Index(categories).argsort()
+    except TypeError:
+        order = pd.Index(categories.astype(str)).argsort()
+    recode = np.empty(len(order), dtype=np.int64)
+    recode[order] = np.arange(len(order))
+    return np.where(codes >= 0, recode[np.maximum(codes, 0)], -1), categories[order]
+
+
+class Aggregate:
+    """Summed gap measures per combination of some cube dimensions
+
+    codes hold one int array per dimension; the code len(categories) marks
+    a missing value, which is kept so that coarser roll-ups still count it.
+    """
+
+    def __init__(self, dims, codes, units, revenue, count):
+        self.dims = dims
+        self.codes = codes
+        self.units = units
+        self.revenue = revenue
+        self.count = count
+
+    def __len__(self):
+        return len(self.count)
+
+
+class GapCube:
+    """Supply gap cube over CUBE_DIMENSIONS with materialized aggregates"""
+
+    def __init__(self, categories, cells, aggregates=DEFAULT_AGGREGATES):
+        self.categories = categories        # dimension -> values, in code order
+        self.last_source = None             # aggregate dimensions behind the last query's sums
+        # The finest aggregate stands in for the individual cells
+        self.aggregates = {CUBE_DIMENSIONS: self._aggregate(cells, CUBE_DIMENSIONS)}
+        for dims in aggregates:
+            self.materialize(dims)
+
+    @classmethod
+    def from_gap_cells(cls, gaps, aggregates=DEFAULT_AGGREGATES):
+        """Cube from forecast_summaries.GapCells"""
+        quarter_codes, quarters = pd.factorize(gaps.quarters)
+        # Quarters in calendar order: by the first week that falls into each
+        first_week = pd.Series(gaps.weeks).groupby(quarter_codes).min()
+        order = np.argsort(first_week.reindex(range(len(quarters))).to_numpy(), kind='stable')
+        recode = np.empty(len(order), dtype=np.int64)
+        recode[order] = np.arange(len(order))
+
+        week_codes, weeks = _sorted_categories(gaps.week_codes, gaps.weeks)
+        cell_codes = {
+            'Quarter': (recode[quarter_codes][gaps.week_codes], np.asarray(quarters, dtype=object)[order]),
+            'Week': (week_codes, weeks),
+        }
+        for name in ('Customer', 'Anker SKU', 'PDT'):
+            cell_codes[name] = _sorted_categories(*gaps.dimensions[name])
+
+        categories = {name: cell_codes[name][1] for name in CUBE_DIMENSIONS}
+        codes = {name: np.where(cell_codes[name][0] >= 0, cell_codes[name][0], len(categories[name]))
+                 for name in CUBE_DIMENSIONS}
+        cells = Aggregate(CUBE_DIMENSIONS, codes, gaps.units, gaps.revenue,
+                          np.ones(len(gaps.units), dtype=np.int64))
+        return cls(categories, cells, aggregates)
+
+    def _dims(self, names):
+        """Dimension names in cube order (ValueError for unknown ones)"""
+        unknown = set(names) - set(CUBE_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}. Available: {list(CUBE_DIMENSIONS)}")
+        return tuple(name for name in CUBE_DIMENSIONS if name in names)
+
+    def _group(self, source, dims, mask=None):
+        """(group codes per dimension, inverse, rows used) of source grouped by dims"""
+        rows = np.arange(len(source)) if mask is None else np.flatnonzero(mask)
+        combined = np.zeros(len(rows), dtype=np.int64)
+        for name in dims:
+            combined = combined * (len(self.categories[name]) + 1) + source.codes[name][rows]
+        groups, inverse = np.unique(combined, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        group_codes = {}
+        for name in reversed(dims):
+            groups, group_codes[name] = np.divmod(groups, len(self.categories[name]) + 1)
+        return {name: group_codes[name] for name in dims}, inverse, rows
+
+    def _aggregate(self, source, dims):
+        group_codes, inverse, rows = self._group(source, dims)
+        n_groups = len(group_codes[dims[0]]) if dims else int(len(rows) > 0)
+        return Aggregate(dims, group_codes,
+                         np.bincount(inverse, weights=source.units[rows], minlength=n_groups),
+                         np.bincount(inverse, weights=source.revenue[rows], minlength=n_groups),
+                         np.bincount(inverse, weights=source.count[rows], minlength=n_groups).astype(np.int64))
+
+    def nearest(self, names):
+        """Smallest materialized aggregate holding all the given dimensions"""
+        names = set(names)
+        candidates = [aggregate for dims, aggregate in self.aggregates.items() if names <= set(dims)]
+        return min(candidates, key=len)
+
+    def materialize(self, dims):
+        """Pre-aggregate the measures over dims (from the nearest finer aggregate)"""
+        dims = self._dims(dims)
+        if dims not in self.aggregates:
+            self.aggregates[dims] = self._aggregate(self.nearest(dims), dims)
+        return self.aggregates[dims]
+
+    def _select(self, source, by, where):
+        """_group() of the source rows matching where, without missing `by` values"""
+        mask = np.ones(len(source), dtype=bool)
+        for name, values in where.items():
+            allowed = pd.Index(self.categories[name]).get_indexer(values)
+            mask &= np.isin(source.codes[name], allowed[allowed >= 0])
+        for name in by:
+            mask &= source.codes[name] < len(self.categories[name])
+        return self._group(source, by, mask)
+
+    def _group_keys(self, group_codes, by):
+        keys = np.zeros(len(group_codes[by[0]]) if by else 1, dtype=np.int64)
+        for name in by:
+            keys = keys * (len(self.categories[name]) + 1) + group_codes[name]
+        return keys
+
+    def _distinct_count(self, name, needed, by, where, group_keys):
+        """Distinct values of dimension name per `by` group, from the nearest aggregate holding it"""
+        source = self.nearest(self._dims(needed | {name}))
+        group_codes, inverse, rows = self._select(source, by, where)
+        n_values = len(self.categories[name])
+        codes = source.codes[name][rows]
+        present = codes < n_values
+        pairs = np.unique(inverse[present].astype(np.int64) * n_values + codes[present])
+        counts = np.bincount(pairs // n_values, minlength=len(group_codes[by[0]]) if by else int(len(rows) > 0))
+
+        # Same groups as the additive measures, matched by key in case of a different order
+        result = np.zeros(len(group_keys), dtype=np.int64)
+        if len(counts):
+            result[np.searchsorted(group_keys, self._group_keys(group_codes, by))] = counts
+        return result
+
+    def query(self, by=(), where=None, measures=MEASURES):
+        """Gap measures grouped by the `by` dimensions, for the cells selected by `where`
+
+        where maps dimensions to one value or a list of values. Groups with a
+        missing value in a `by` dimension are left out, as in
+        DataFrame.groupby. Returns a DataFrame sorted by the `by` dimensions.
+        Summed measures come from the smallest aggregate holding the `by` and
+        `where` dimensions; each distinct count from the smallest one that
+        also holds the dimension it counts.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        where = {name: [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+                 for name, values in (where or {}).items()}
+        unknown = set(measures) - set(MEASURES)
+        if unknown:
+            raise ValueError(f"Unknown measures: {sorted(unknown)}. Available: {list(MEASURES)}")
+
+        needed = set(by) | set(where)
+        source = self.nearest(self._dims(needed))
+        self.last_source = source.dims
+
+        group_codes, inverse, rows = self._select(source, by, where)
+        n_groups = len(group_codes[by[0]]) if by else int(len(rows) > 0)
+
+        result = {name: self.categories[name][group_codes[name]] for name in by}
+        sums = {
+            'Gap Units': np.abs(np.bincount(inverse, weights=source.units[rows], minlength=n_groups)),
+            'Revenue Impact': np.abs(np.bincount(inverse, weights=source.revenue[rows], minlength=n_groups)),
+            'Gap Records': np.bincount(inverse, weights=source.count[rows], minlength=n_groups).astype(np.int64),
+        }
+        group_keys = self._group_keys(group_codes, by)[:n_groups]
+        for measure in measures:
+            if measure in DISTINCT_MEASURES:
+                result[measure] = self._distinct_count(DISTINCT_MEASURES[measure], needed, by, where, group_keys)
+            else:
+                result[measure] = sums[measure]
+        return pd.DataFrame(result, columns=by + list(measures))
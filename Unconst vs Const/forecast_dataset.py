@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - PARQUET DATASET
+Out-of-core storage for the tall Looker view: a hive-partitioned Parquet
+dataset (Version / Quarter / Week / Forecast Type) written chunk by chunk,
+and a reader that prunes partitions by version/quarter and pushes customer
+and PDT filters down to the Parquet row groups.
+"""
+
+import os
+import shutil
+from urllib.parse import unquote
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+PARTITION_COLUMNS = ['Quarter', 'Week', 'Forecast Type']
+
+
+def write_dataset(batches, root, version=None):
+    """Write Arrow record batches of the tall view under root
+
+    With a version label the batches go below Version=<label>, and rewriting
+    the same version replaces all of its partitions while other versions are
+    kept. Without one the write replaces every partition under root, so
+    weeks that dropped out of the view do not linger.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet datasets. Install pyarrow")
+    partition_columns = (['Version'] if version is not None else []) + PARTITION_COLUMNS
+    batches = (_with_version(batch, version) for batch in batches)
+    first = next(batches, None)
+    if first is None:
+        return root
+
+    schema = first.schema
+    _clear_partitions(root, version)
+    ds.write_dataset(
+        _conform(first, batches, schema),
+        root,
+        schema=schema,
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([schema.field(name) for name in partition_columns]), flavor='hive'),
+        existing_data_behavior='overwrite_or_ignore',
+        max_rows_per_group=100000,
+    )
+    print(f"✓ Saved Parquet dataset to {root}" + (f" (version {version})" if version is not None else ""))
+    return root
+
+
+def _clear_partitions(root, version):
+    """Remove the partition directories a write replaces: one version's, or all of them"""
+    if not os.path.isdir(root):
+        return
+    key = 'Version' if version is not None else PARTITION_COLUMNS[0]
+    for name in os.listdir(root):
+        field, _, value = name.partition('=')
+        path = os.path.join(root, name)
+        if field == key and os.path.isdir(path) and (version is None or unquote(value) == str(version)):
+            shutil.rmtree(path)
+
+
+def _with_version(batch, version):
+    if version is None:
+        return batch
+    return batch.append_column('Version', pa.array([str(version)] * batch.num_rows, pa.string()))
+
+
+def _conform(first, rest, schema):
+    """Yield all batches cast to the schema of the first one"""
+    yield first
+    for batch in rest:
+        yield batch if batch.schema.equals(schema) else pa.Table.from_batches([batch]).cast(schema).to_batches()[0]
+
+
+def open_dataset(root):
+    """Open a dataset written by write_dataset"""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet datasets. Install pyarrow")
+    return ds.dataset(root, format='parquet', partitioning='hive')
+
+
+def dataset_filter(versions=None, quarters=None, customers=None, pdts=None, forecast_types=None):
+    """Arrow filter expression for the given selections (None = no filter)"""
+    selections = [('Version', versions), ('Quarter', quarters), ('Customer', customers),
+                  ('PDT', pdts), ('Forecast Type', forecast_types)]
+    expression = None
+    for column, values in selections:
+        if values is None:
+            continue
+        values = [values] if isinstance(values, str) else list(values)
+        condition = ds.field(column).isin(values)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_dataset(root, versions=None, quarters=None, customers=None, pdts=None,
+                 forecast_types=None, columns=None):
+    """Read a filtered slice of the dataset into a DataFrame
+
+    Version/quarter/forecast type filters skip whole partition directories;
+    customer/PDT filters are evaluated against Parquet row-group statistics
+    before any rows are decoded.
+    """
+    dataset = open_dataset(root)
+    table = dataset.to_table(columns=columns,
+                             filter=dataset_filter(versions, quarters, customers, pdts, forecast_types))
+    return table.to_pandas()
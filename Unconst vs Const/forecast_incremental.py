@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - INCREMENTAL RE-TRANSFORM
+Keeps a content hash per Important Helper row from the previous run, with
+that run's tall view and supply gap cells, and re-derives tall rows and gap
+cells only for helpers whose constrained, unconstrained, price or dimension
+values changed. Every helper owns one contiguous block of tall rows, so the
+new view is spliced from zero-copy slices of the previous one and the fresh
+blocks of the changed helpers.
+
+The previous tall view is kept as an uncompressed Arrow IPC file next to
+the state file and memory-mapped on the next run: text columns are reused
+without being converted again, which is what makes a rerun cheaper than a
+full transform. The price is disk space: the file is about as large as the
+tall view in memory (~160 bytes per record).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from forecast_summaries import GapCells, cell_deltas
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+STATE_VERSION = 3
+
+
+def row_keys(helpers):
+    """Stable key per helper row; repeated helpers are numbered by occurrence"""
+    helpers = pd.Series(helpers, dtype=object)
+    occurrence = helpers.groupby(helpers, sort=False).cumcount()
+    return (helpers + '#' + occurrence.astype(str)).to_numpy(dtype=object)
+
+
+def row_hashes(matrix):
+    """uint64 content hash of every helper row of a ForecastMatrix"""
+    columns = {
+        'helper': pd.Series(matrix.helpers, dtype=object),
+        'customer': pd.Series(matrix.values('Customer'), dtype=object),
+        'sku': pd.Series(matrix.values('Anker SKU'), dtype=object),
+        'pdt': pd.Series(matrix.values('PDT'), dtype=object),
+    }
+    numbers = np.hstack([matrix.constrained, matrix.unconstrained,
+                         matrix.price[:, None], matrix.unconstrained_price[:, None]])
+    frame = pd.concat([pd.DataFrame(columns), pd.DataFrame(numbers)], axis=1)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def records_per_row(matrix, sparse=False):
+    """Tall records of every helper row (two per kept cell)"""
+    if sparse:
+        return matrix.nonzero_cells().sum(axis=1) * 2
+    return np.full(matrix.shape[0], matrix.shape[1] * 2, dtype=np.int64)
+
+
+class IncrementalState:
+    """Previous run's row hashes, per-helper tall blocks and gap cells, on disk
+
+    state_file holds the keys, hashes and gap cells; the tall view goes to
+    the .arrow file beside it.
+    """
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.tall_file = os.path.splitext(state_file)[0] + '.arrow'
+
+    def load(self):
+        if not os.path.exists(self.state_file) or not os.path.exists(self.tall_file):
+            return None
+        try:
+            state = pd.read_pickle(self.state_file)
+            if state.get('version') != STATE_VERSION:
+                return None
+            state['tall'] = feather.read_table(self.tall_file, memory_map=True)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable incremental state {self.state_file}: {e}")
+            return None
+        return state
+
+    def save(self, state, tall):
+        """Write the state; tall (a pyarrow Table) only when it changed"""
+        if tall is not None:
+            partial = self.tall_file + '.partial'
+            feather.write_feather(tall, partial, compression='uncompressed')
+            os.replace(partial, self.tall_file)
+        pd.to_pickle(dict(state, version=STATE_VERSION), self.state_file)
+
+    def transform(self, matrix, quarters, current_quarter, sparse=False):
+        """Return (tall view, GapCells, changed row positions) for matrix, reusing the last run
+
+        Falls back to a full transform when there is no compatible state
+        (first run, different week columns, quarter mapping, current quarter
+        or sparse setting).
+        """
+        keys = row_keys(matrix.helpers)
+        hashes = row_hashes(matrix)
+        layout = {
+            'week_columns': [str(week) for week in matrix.week_columns],
+            'quarters': list(quarters),
+            'current_quarter': current_quarter,
+            'sparse': sparse,
+        }
+        n_rows = matrix.shape[0]
+        records = records_per_row(matrix, sparse)
+
+        state = self.load()
+        previous_rows = np.full(n_rows, -1)
+        if state is not None and state['layout'] == layout:
+            previous_rows = pd.Index(state['keys']).get_indexer(keys)
+            same = previous_rows >= 0
+            same[same] = state['hashes'][previous_rows[same]] == hashes[same]
+            previous_rows[~same] = -1
+        changed = np.flatnonzero(previous_rows < 0)
+
+        # Gap cells: the changed rows are re-derived, the others move to their new row
+        constrained = matrix.constrained[changed]
+        unconstrained = matrix.unconstrained[changed]
+        gap_rows, gap_weeks = np.nonzero(constrained < unconstrained)
+        gap_rows = changed[gap_rows]
+        gap_units, gap_revenue = cell_deltas(matrix, gap_rows, gap_weeks)
+        if len(changed) < n_rows:
+            new_row = np.full(len(state['keys']), -1)
+            new_row[previous_rows[previous_rows >= 0]] = np.flatnonzero(previous_rows >= 0)
+            moved = new_row[state['gap_rows']]
+            kept = moved >= 0
+            gap_rows = np.concatenate([moved[kept], gap_rows])
+            gap_weeks = np.concatenate([state['gap_weeks'][kept], gap_weeks])
+            gap_units = np.concatenate([state['gap_units'][kept], gap_units])
+            gap_revenue = np.concatenate([state['gap_revenue'][kept], gap_revenue])
+            order = np.lexsort((gap_weeks, gap_rows))   # sheet order, as np.nonzero gives it
+            gap_rows, gap_weeks = gap_rows[order], gap_weeks[order]
+            gap_units, gap_revenue = gap_units[order], gap_revenue[order]
+        gaps = GapCells.from_cells(matrix, quarters, gap_rows, gap_weeks, gap_units, gap_revenue)
+
+        # Tall view: fresh blocks for the changed rows, slices of the last view for the rest
+        unchanged = (state is not None and len(changed) == 0 and len(state['keys']) == n_rows
+                     and (previous_rows == np.arange(n_rows)).all())
+        if unchanged:
+            table = None
+            tall = state['tall'].to_pandas()
+        elif len(changed) == n_rows:
+            tall = matrix.to_tall(quarters, current_quarter, sparse=sparse)
+            table = pa.Table.from_pandas(tall, preserve_index=False)
+        else:
+            fresh = pa.Table.from_pandas(matrix.subset(changed).to_tall(quarters, current_quarter, sparse=sparse),
+                                         preserve_index=False)
+            table = pa.concat_tables(self._splice(state, previous_rows, changed, records, fresh))
+            tall = table.to_pandas()
+
+        self.save({'keys': keys, 'hashes': hashes, 'layout': layout, 'records': records,
+                   'gap_rows': gap_rows, 'gap_weeks': gap_weeks,
+                   'gap_units': gap_units, 'gap_revenue': gap_revenue}, table)
+        return tall, gaps, changed
+
+    @staticmethod
+    def _splice(state, previous_rows, changed, records, fresh):
+        """Table slices that make up the new view, one per run of consecutive rows of one source"""
+        previous_offsets = np.concatenate([[0], np.cumsum(state['records'])])
+        fresh_offsets = np.concatenate([[0], np.cumsum(records[changed])])
+        fresh_slot = np.full(len(previous_rows), -1)
+        fresh_slot[changed] = np.arange(len(changed))
+
+        # Source table and block index per row; a run continues while both step by one
+        from_fresh = previous_rows < 0
+        block = np.where(from_fresh, fresh_slot, previous_rows)
+        breaks = np.flatnonzero((np.diff(block) != 1) | (np.diff(from_fresh.astype(np.int8)) != 0)) + 1
+        pieces = []
+        for start, stop in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [len(block)]])):
+            table, offsets = (fresh, fresh_offsets) if from_fresh[start] else (state['tall'], previous_offsets)
+            first, last = block[start], block[stop - 1]
+            pieces.append(table.slice(offsets[first], offsets[last + 1] - offsets[first]))
+        return pieces
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - FAST WORKBOOK LOADER
+Opens the forecast workbook once in openpyxl's streaming read-only mode and
+reads only the columns the transform uses: the identity columns, the
+sell-in price column and the 202xxx week columns, as planned by
+forecast_schema. Week and price columns get float dtypes up front, and
+parse time is reported per sheet. CSV exports of the sheets ('$5,460.00',
+'#N/A') are cleaned column-wise with vectorized string operations.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast_schema import PROBE_ROWS, canonicalize_frame, resolve_sheet_names, sniff_schema
+
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import pyarrow  # noqa: F401  (feather cache format)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+LOADER_VERSION = 2  # bump when parsing changes so stale cache entries are ignored
+
+# Spreadsheet error values found in CSV exports
+ERROR_VALUES = ('#N/A', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#NULL!', 'N/A')
+
+
+def load_wide_sheets(path):
+    """Read the constrained/unconstrained sheets, pruned to the planned columns
+
+    Sheets and columns are resolved by forecast_schema from the first rows
+    only; the data rows are then read up to the last planned column.
+    Returns {'constrained': DataFrame, 'unconstrained': DataFrame} in the
+    canonical layout and prints rows, kept columns and parse time per sheet.
+    """
+    start = time.perf_counter()
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    print(f"  Opened workbook in {time.perf_counter() - start:.2f}s")
+    try:
+        frames = {}
+        sheet_names = resolve_sheet_names(workbook.sheetnames)
+        for role, sheet_name in zip(('constrained', 'unconstrained'), sheet_names):
+            sheet_start = time.perf_counter()
+            sheet = workbook[sheet_name]
+            schema = sniff_schema([list(row) for row in sheet.iter_rows(max_row=PROBE_ROWS, values_only=True)])
+
+            rows = list(sheet.iter_rows(min_row=schema.header_row + 2, max_col=schema.last_column,
+                                        values_only=True))
+            while rows and all(value is None for value in rows[-1]):
+                rows.pop()  # trailing blank/formatted rows
+
+            frames[role] = schema.frame_from_rows(rows)
+            print(f"  Parsed {sheet_name}: {len(rows)} rows, {len(schema.positions)} of "
+                  f"{len(schema.header)} columns in {time.perf_counter() - sheet_start:.2f}s")
+        return frames
+    finally:
+        workbook.close()
+
+
+def read_excel_sheets(path):
+    """pd.read_excel counterpart of load_wide_sheets (any Excel format pandas reads)"""
+    with pd.ExcelFile(path) as workbook:
+        sheet_names = resolve_sheet_names(workbook.sheet_names)
+        return {role: canonicalize_frame(pd.read_excel(workbook, sheet_name=sheet_name))
+                for role, sheet_name in zip(('constrained', 'unconstrained'), sheet_names)}
+
+
+def clean_numeric(values, error_value=0.0):
+    """Parse exported number strings ('$5,460.00', '-$1,224.67', '(76.00)', '#N/A') in one pass
+
+    Spreadsheet error values become error_value (0 or NaN), blanks become
+    NaN. Returns (float Series, counts) where counts tallies currency
+    strings, error values, blanks and unparseable values.
+    """
+    text = pd.Series(values, dtype='string').str.strip()
+    blank = text.isna() | (text == '')
+    errors = text.str.upper().isin(ERROR_VALUES).fillna(False)
+    currency = text.str.contains('$', regex=False).fillna(False)
+
+    cleaned = text.str.replace(r'[$,"\s]', '', regex=True)
+    cleaned = cleaned.str.replace(r'^\((.*)\)$', r'-\1', regex=True)  # accounting negatives
+    numbers = pd.to_numeric(cleaned.where(~errors & ~blank), errors='coerce').astype(np.float64)
+    invalid = numbers.isna() & ~errors & ~blank
+    numbers[errors.to_numpy()] = error_value
+
+    counts = {
+        'cells': len(text),
+        'currency': int(currency.sum()),
+        'errors': int(errors.sum()),
+        'blank': int(blank.sum()),
+        'invalid': int(invalid.sum()),
+    }
+    return numbers, counts
+
+
+def read_wide_csv(path, error_value=0.0):
+    """Read one wide forecast CSV export into the canonical layout
+
+    The header is sniffed like a workbook sheet; the price and week columns
+    are cleaned with clean_numeric. Returns (DataFrame, data quality counts).
+    """
+    start = time.perf_counter()
+    raw = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    schema = sniff_schema(raw.head(PROBE_ROWS).values.tolist())
+    body = raw.iloc[schema.header_row + 1:]
+    body = body[(body != '').any(axis=1)]  # blank export rows
+
+    quality = {'cells': 0, 'currency': 0, 'errors': 0, 'blank': 0, 'invalid': 0}
+    numeric = {schema.identity['Sell-in Price']} | {position for position, _ in schema.weeks}
+    columns = {}
+    for position in schema.positions:
+        values = body.iloc[:, position]
+        if position in numeric:
+            values, counts = clean_numeric(values, error_value)
+            for name, count in counts.items():
+                quality[name] += count
+        else:
+            values = values.replace('', None)
+        columns[position] = values.tolist()
+
+    frame = schema.frame(columns, len(body))
+    print(f"  Parsed {os.path.basename(path)}: {len(body)} rows, {len(schema.weeks)} weeks in "
+          f"{time.perf_counter() - start:.2f}s ({quality['currency']} currency strings, "
+          f"{quality['errors']} error values, {quality['invalid']} invalid)")
+    return frame, quality
+
+
+class SheetCache:
+    """Parsed wide sheets stored as Feather files, keyed by workbook content hash
+
+    The key covers the workbook bytes and the loader options, so an edited
+    workbook or different options never hit a stale entry. Entries are
+    evicted least recently used first once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir='.forecast_cache', max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, path, options):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(json.dumps({'loader': LOADER_VERSION, **options}, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:32]
+
+    def get(self, key):
+        """{sheet name: DataFrame} for a cached key, or None"""
+        entry = os.path.join(self.cache_dir, key)
+        manifest_file = os.path.join(entry, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            return None
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+            frames = {}
+            for i, sheet in enumerate(manifest['sheets']):
+                frame = pd.read_feather(os.path.join(entry, f"{i}.feather"))
+                frame.columns = [int(label) if is_int else label for label, is_int in sheet['columns']]
+                frames[sheet['name']] = frame
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable cache entry {key}: {e}")
+            return None
+        os.utime(entry)  # mark as recently used
+        return frames
+
+    def put(self, key, frames):
+        """Store frames under key; if another writer stores the key first, keep theirs
+
+        Keys are content hashes, so an entry that already exists holds the
+        same sheets and losing the race is as good as a cache hit.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        manifest_file = os.path.join(entry, 'manifest.json')
+        partial = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = tempfile.mkdtemp(prefix=key + '.', suffix='.partial', dir=self.cache_dir)
+            manifest = {'sheets': []}
+            for i, (name, frame) in enumerate(frames.items()):
+                columns = [[str(label), isinstance(label, (int, np.integer))] for label in frame.columns]
+                stored = frame.copy(deep=False)
+                stored.columns = [label for label, _ in columns]
+                stored.reset_index(drop=True).to_feather(os.path.join(partial, f"{i}.feather"))
+                manifest['sheets'].append({'name': name, 'columns': columns})
+            with open(os.path.join(partial, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f)
+            if not os.path.exists(manifest_file):
+                shutil.rmtree(entry, ignore_errors=True)   # a broken entry, not another writer's
+                try:
+                    os.replace(partial, entry)
+                except OSError:
+                    if not os.path.exists(manifest_file):
+                        raise
+            self.evict()
+        except Exception as e:
+            print(f"⚠️ Could not cache parsed sheets: {e}")
+        finally:
+            if partial is not None:
+                shutil.rmtree(partial, ignore_errors=True)
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes
+
+        Entries another thread or process removes while the cache is scanned
+        are skipped.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry) and not name.endswith('.partial'):
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                    entries.append((os.path.getmtime(entry), size, entry))
+                except FileNotFoundError:
+                    continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def load_wide_sheets_cached(path, cache, fast=True):
+    """load_wide_sheets (or read_excel_sheets when fast=False) behind a SheetCache"""
+    start = time.perf_counter()
+    key = cache.key(path, {'fast': fast})
+    frames = cache.get(key)
+    if frames is not None:
+        print(f"  Loaded parsed sheets from cache {key[:12]} in {time.perf_counter() - start:.3f}s")
+        return frames
+
+    frames = load_wide_sheets(path) if fast else read_excel_sheets(path)
+    cache.put(key, frames)
+    return frames
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - DENSE FORECAST MATRIX
+Holds one constrained/unconstrained forecast pair as two aligned
+helpers x weeks float matrices plus per-helper price and dimension arrays.
+Every measure is a broadcast operation; the tall Looker view is only
+built when it is asked for.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def find_week_columns(df):
+    """Return the week columns (format: 202xxx) of a wide sheet"""
+    week_columns = []
+    for col in df.columns:
+        col_str = str(col)
+        if col_str.isdigit() and col_str.startswith('202') and len(col_str) == 6:
+            week_columns.append(col)  # Keep original column type (int or str)
+    return week_columns
+
+
+def numeric_matrix(df):
+    """Return a float matrix for the given columns with missing values as 0"""
+    values = df.to_numpy(dtype=float, copy=True)
+    values[np.isnan(values)] = 0
+    return values
+
+
+class JoinIndex:
+    """Integer-coded Important Helper x week index over one wide sheet
+
+    Helper values are dictionary-encoded to ints (the last sheet row wins for
+    duplicate helpers) and week codes map to column positions, so a
+    helper/week lookup is two array indexes instead of a string-keyed dict.
+    Shared by the transform, the summaries and version comparisons.
+    """
+
+    def __init__(self, helpers, week_columns):
+        helper_index = pd.Index(helpers)
+        self.rows = np.flatnonzero(~helper_index.duplicated(keep='last'))  # sheet row per helper code
+        self.helpers = helper_index[self.rows]
+        self.week_columns = list(week_columns)
+        self.weeks = np.array([int(week) for week in week_columns], dtype=np.int64)
+        self._week_positions = {int(week): position for position, week in enumerate(self.weeks)}
+
+    def __len__(self):
+        return len(self.helpers)
+
+    def helper_codes(self, helpers):
+        """Helper code of each value, -1 when the helper is not indexed"""
+        return self.helpers.get_indexer(helpers)
+
+    def week_positions(self, weeks):
+        """Column position of each week code, -1 when the week is not indexed"""
+        return np.array([self._week_positions.get(int(week), -1) for week in weeks], dtype=np.intp)
+
+    def lookup(self, helper, week):
+        """(sheet row, column) of one helper/week cell, or None"""
+        code = self.helpers.get_indexer([helper])[0]
+        position = self._week_positions.get(int(week), -1)
+        if code < 0 or position < 0:
+            return None
+        return self.rows[code], position
+
+    def take(self, matrix, helpers, weeks, fill=0.0):
+        """Gather a sheet-row x week matrix into the (helpers, weeks) layout of another sheet"""
+        rows = self.helper_codes(helpers)
+        columns = self.week_positions(weeks)
+        out = np.full((len(rows), len(columns)), fill, dtype=matrix.dtype)
+        found_rows = rows >= 0
+        found_columns = columns >= 0
+        out[np.ix_(found_rows, found_columns)] = matrix[np.ix_(self.rows[rows[found_rows]], columns[found_columns])]
+        return out
+
+    def take_rows(self, vector, helpers, fill=0.0):
+        """Gather a per-sheet-row vector into the helper order of another sheet"""
+        rows = self.helper_codes(helpers)
+        out = np.full(len(rows), fill, dtype=vector.dtype)
+        found = rows >= 0
+        out[found] = vector[self.rows[rows[found]]]
+        return out
+
+
+class ForecastMatrix:
+    """Constrained vs unconstrained forecasts for one FC version"""
+
+    def __init__(self, helpers, week_columns, constrained, unconstrained,
+                 price, unconstrained_price, dimensions):
+        self.helpers = helpers                      # (helpers,) object
+        self.week_columns = list(week_columns)      # original sheet labels
+        self.weeks = np.array([int(week) for week in week_columns], dtype=np.int64)
+        self.constrained = constrained              # (helpers, weeks) float64 units
+        self.unconstrained = unconstrained          # (helpers, weeks) float64 units
+        self.price = price                          # (helpers,) constrained sell-in price
+        self.unconstrained_price = unconstrained_price
+        # name -> (codes, categories); categories[codes] gives the sheet values
+        self.dimensions = dimensions
+        self._index = None
+
+    @property
+    def shape(self):
+        return self.constrained.shape
+
+    @property
+    def nbytes(self):
+        arrays = [self.constrained, self.unconstrained, self.price, self.unconstrained_price]
+        arrays += [codes for codes, _ in self.dimensions.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def codes(self, name):
+        return self.dimensions[name][0]
+
+    def categories(self, name):
+        return self.dimensions[name][1]
+
+    def values(self, name):
+        """Per-helper dimension values decoded back to the sheet values"""
+        codes, categories = self.dimensions[name]
+        return categories[codes]
+
+    # Measures (broadcast over helpers x weeks)
+    @property
+    def constrained_revenue(self):
+        return self.constrained * self.price[:, None]
+
+    @property
+    def unconstrained_revenue(self):
+        return self.unconstrained * self.unconstrained_price[:, None]
+
+    @property
+    def delta_units(self):
+        return self.constrained - self.unconstrained
+
+    @property
+    def delta_revenue(self):
+        return self.constrained_revenue - self.unconstrained_revenue
+
+    @property
+    def gap_mask(self):
+        return self.delta_units < 0
+
+    @classmethod
+    def from_wide(cls, constrained_df, unconstrained_df, week_columns, price_column):
+        """Build the matrix from the Constrained/Unconstrained Wide sheets
+
+        Constrained rows without helper, customer or SKU are dropped. The
+        unconstrained sheet is aligned to the remaining helpers by week code
+        through a JoinIndex (last row wins for duplicate helpers, missing
+        helpers/weeks are 0).
+        """
+        helpers = np.array([str(h) for h in constrained_df.iloc[:, 0]], dtype=object)
+        keep = ((helpers != 'nan')
+                & constrained_df.iloc[:, 5].notna().to_numpy()
+                & constrained_df.iloc[:, 6].notna().to_numpy())
+        constrained_df = constrained_df[keep]
+        helpers = helpers[keep]
+
+        price = numeric_matrix(constrained_df[[price_column(constrained_df)]])[:, 0]
+        constrained = numeric_matrix(constrained_df[week_columns])
+
+        source = JoinIndex([str(h) for h in unconstrained_df.iloc[:, 0]], find_week_columns(unconstrained_df))
+        source_units = numeric_matrix(unconstrained_df[source.week_columns])
+        source_price = numeric_matrix(unconstrained_df[[price_column(unconstrained_df)]])[:, 0]
+        # Helpers missing from the unconstrained sheet keep 0 units and 0 revenue
+        unconstrained = source.take(source_units, helpers, week_columns)
+        unconstrained_price = source.take_rows(source_price, helpers)
+
+        dimensions = {}
+        for name, position in (('Customer', 5), ('Anker SKU', 6), ('PDT', 3), ('Customer ID', 4)):
+            codes, categories = pd.factorize(constrained_df.iloc[:, position].to_numpy(), use_na_sentinel=False)
+            dimensions[name] = (codes.astype(np.int32), np.asarray(categories, dtype=object))
+
+        return cls(helpers, week_columns, constrained, unconstrained, price, unconstrained_price, dimensions)
+
+    def subset(self, rows):
+        """New matrix holding only the given helper rows (positions or mask)"""
+        dimensions = {name: (codes[rows], categories) for name, (codes, categories) in self.dimensions.items()}
+        return ForecastMatrix(self.helpers[rows], self.week_columns, self.constrained[rows],
+                              self.unconstrained[rows], self.price[rows],
+                              self.unconstrained_price[rows], dimensions)
+
+    @property
+    def index(self):
+        """JoinIndex over this matrix's helpers and weeks"""
+        if self._index is None:
+            self._index = JoinIndex(self.helpers, self.week_columns)
+        return self._index
+
+    def nonzero_cells(self):
+        """Mask of helper/week cells where either forecast is non-zero"""
+        return (self.constrained != 0) | (self.unconstrained != 0)
+
+    def to_tall(self, quarters, current_quarter, start=0, stop=None, sparse=False):
+        """Materialize the Looker_Ready_View
+
+        One Constrained row followed by one Unconstrained row for every
+        helper/week, in sheet order. quarters holds the quarter label of
+        each week column; start/stop restrict the output to a helper range.
+        With sparse=True cells where both forecasts are 0 are left out.
+        """
+        rows = slice(start, stop)
+        n_rows, n_weeks = self.constrained[rows].shape
+
+        # Helper / week position of every output cell
+        if sparse:
+            cell_rows, cell_weeks = np.nonzero((self.constrained[rows] != 0) | (self.unconstrained[rows] != 0))
+        else:
+            cell_rows = np.repeat(np.arange(n_rows), n_weeks)
+            cell_weeks = np.tile(np.arange(n_weeks), n_rows)
+        cell_rows = cell_rows + (start or 0)
+        return self.tall_frame(cell_rows, cell_weeks, self.tall_numbers(cell_rows, cell_weeks),
+                               quarters, current_quarter)
+
+    def tall_numbers(self, cell_rows, cell_weeks):
+        """Numeric Looker_Ready_View columns of the given helper/week cells
+
+        Two records per cell, Constrained then Unconstrained.
+        """
+        constrained = self.constrained[cell_rows, cell_weeks]
+        unconstrained = self.unconstrained[cell_rows, cell_weeks]
+        price = self.price[cell_rows]
+        constrained_revenue = constrained * price
+        unconstrained_revenue = unconstrained * self.unconstrained_price[cell_rows]
+        zeros = np.zeros_like(constrained)
+
+        def interleave(constrained, unconstrained):
+            return np.stack([constrained, unconstrained], axis=1).reshape(-1)
+
+        return {
+            'Forecast - Units': interleave(constrained, unconstrained),
+            'Forecast Revenue': interleave(constrained_revenue, unconstrained_revenue),
+            'Delta Units': interleave(constrained - unconstrained, zeros),  # Delta is 0 for unconstrained (baseline)
+            'Delta - Revenue': interleave(constrained_revenue - unconstrained_revenue, zeros),
+            'Sell-In Price': price.repeat(2),
+        }
+
+    def tall_frame(self, cell_rows, cell_weeks, numbers, quarters, current_quarter):
+        """Assemble the Looker_Ready_View from cell positions and their tall_numbers()
+
+        Text columns index each dimension's categories, converted to a pandas
+        array once, by record instead of converting every record's string.
+        """
+        quarters = np.asarray(quarters, dtype=object)
+        record_rows = np.repeat(cell_rows, 2)
+        record_weeks = np.repeat(cell_weeks, 2)
+
+        def labels(categories, codes):
+            if not len(codes):
+                return np.array([], dtype=object)
+            return pd.Series(np.asarray(categories, dtype=object)).array.take(np.asarray(codes, dtype=np.intp))
+
+        def per_helper(name):
+            return labels(self.categories(name), self.codes(name)[record_rows])
+
+        return pd.DataFrame({
+            'Customer': per_helper('Customer'),
+            'Anker SKU': per_helper('Anker SKU'),
+            'PDT': per_helper('PDT'),
+            'Forecast Type': labels(['Constrained', 'Unconstrained'], np.tile([0, 1], len(cell_rows))),
+            'Quarter': labels(quarters, record_weeks),
+            'Week': self.weeks[record_weeks],
+            'Forecast - Units': numbers['Forecast - Units'],
+            'Forecast Revenue': numbers['Forecast Revenue'],
+            'Delta Units': numbers['Delta Units'],
+            'Delta - Revenue': numbers['Delta - Revenue'],
+            'Gap Flag': labels(['', 'Supply Gap'], numbers['Delta Units'] < 0),
+            'IsCurrentQ': (quarters == current_quarter)[record_weeks],
+            'Helper': labels(self.helpers, record_rows),
+            'Sell-In Price': numbers['Sell-In Price'],
+        })
+
+    def iter_tall(self, quarters, current_quarter, chunk_rows=100000, sparse=False):
+        """Yield the Looker_Ready_View in DataFrames of at most ~chunk_rows records
+
+        Chunks always hold whole helpers, so at least one helper per chunk.
+        An empty matrix still yields one empty chunk carrying the columns.
+        """
+        n_rows, n_weeks = self.shape
+        helpers_per_chunk = max(1, chunk_rows // max(1, n_weeks * 2))
+        for start in range(0, max(n_rows, 1), helpers_per_chunk):
+            yield self.to_tall(quarters, current_quarter, start, start + helpers_per_chunk, sparse)
+
+    def sparse_metadata(self, quarters, current_quarter):
+        """What densify_tall needs to rebuild the dense view from a sparse one"""
+        quarters = np.asarray(quarters, dtype=object)
+        return {
+            'helpers': pd.DataFrame({
+                'Customer': self.values('Customer'),
+                'Anker SKU': self.values('Anker SKU'),
+                'PDT': self.values('PDT'),
+                'Helper': self.helpers,
+                'Sell-In Price': self.price,
+            }),
+            'weeks': pd.DataFrame({
+                'Quarter': quarters,
+                'Week': self.weeks,
+                'IsCurrentQ': quarters == current_quarter,
+            }),
+            # Flat helper * weeks + week position of every kept cell, in output order
+            'cells': np.flatnonzero(self.nonzero_cells()),
+        }
+
+
+def densify_tall(sparse_tall, metadata):
+    """Rebuild the dense Looker_Ready_View from a sparse one and its metadata"""
+    helpers = metadata['helpers']
+    weeks = metadata['weeks']
+    n_rows, n_weeks = len(helpers), len(weeks)
+    row = np.repeat(np.arange(n_rows), n_weeks * 2)
+    week = np.tile(np.repeat(np.arange(n_weeks), 2), n_rows)
+    slots = (metadata['cells'][:, None] * 2 + np.arange(2)).reshape(-1)
+
+    def scatter(column, fill):
+        values = sparse_tall[column].to_numpy()
+        dense = np.full(n_rows * n_weeks * 2, fill, dtype=values.dtype if fill != '' else object)
+        dense[slots] = values
+        return dense
+
+    return pd.DataFrame({
+        'Customer': helpers['Customer'].to_numpy()[row],
+        'Anker SKU': helpers['Anker SKU'].to_numpy()[row],
+        'PDT': helpers['PDT'].to_numpy()[row],
+        'Forecast Type': np.tile(np.array(['Constrained', 'Unconstrained'], dtype=object), n_rows * n_weeks),
+        'Quarter': weeks['Quarter'].to_numpy()[week],
+        'Week': weeks['Week'].to_numpy()[week],
+        'Forecast - Units': scatter('Forecast - Units', 0.0),
+        'Forecast Revenue': scatter('Forecast Revenue', 0.0),
+        'Delta Units': scatter('Delta Units', 0.0),
+        'Delta - Revenue': scatter('Delta - Revenue', 0.0),
+        'Gap Flag': scatter('Gap Flag', ''),
+        'IsCurrentQ': weeks['IsCurrentQ'].to_numpy()[week],
+        'Helper': helpers['Helper'].to_numpy()[row],
+        'Sell-In Price': helpers['Sell-In Price'].to_numpy()[row],
+    })
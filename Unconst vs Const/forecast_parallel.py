@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - PROCESS-POOL SHARDED TRANSFORM
+Partitions the forecast matrix by Customer ID and builds the tall view of
+each shard, text columns included, in a process pool. The matrix arrays
+are placed in shared memory once and the helper/dimension labels are sent
+once per worker, so workers read them in place instead of receiving a
+pickled copy per shard. Each worker writes its shard to an Arrow IPC file
+that the parent memory-maps and splices back into sheet order.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from forecast_matrix import ForecastMatrix
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Smallest matrix (helper/week cells) worth sending to the pool.
+# UNMEASURED ON MULTICORE: the only benchmark host so far had a single CPU,
+# so this is an estimate from its per-stage timings at 20k x 52 (1M cells):
+# to_tall 0.29s; the same work split into shards in the workers, Arrow
+# conversion and shard files included, 0.46s; the parent's concatenate and
+# reorder 0.04s for customer-sorted sheets (0.2s when customers interleave).
+# With 4 cores that projects to break-even near 1M cells and ~1.3x at 4M,
+# hence 2M. Re-run benchmark_parallel on the production machine and adjust.
+PARALLEL_MIN_CELLS = 2_000_000
+
+
+class SharedArrays:
+    """numpy arrays copied into named shared memory blocks"""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_shared(specs):
+    """Open the blocks described by SharedArrays.specs; returns (blocks, arrays)"""
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+# Worker-side matrix, set up once per pool process by _start_worker
+_worker = {}
+
+
+def _start_worker(specs, helpers, week_columns, categories, quarters, current_quarter):
+    """Pool initializer: attach the shared arrays and rebuild the matrix around them"""
+    blocks, arrays = attach_shared(specs)
+    dimensions = {name: (arrays['codes:' + name], labels) for name, labels in categories.items()}
+    _worker.update(
+        blocks=blocks,
+        matrix=ForecastMatrix(helpers, week_columns, arrays['constrained'], arrays['unconstrained'],
+                              arrays['price'], arrays['unconstrained_price'], dimensions),
+        quarters=quarters,
+        current_quarter=current_quarter,
+    )
+
+
+def _transform_shard(rows, sparse, path):
+    """Worker: write the tall view of one shard of helper rows to an Arrow IPC file
+
+    The shard's records are in sheet order of its rows. Writing a file the
+    parent memory-maps avoids sending the records back through a pipe.
+    """
+    shard = _worker['matrix'].subset(rows)
+    tall = shard.to_tall(_worker['quarters'], _worker['current_quarter'], sparse=sparse)
+    table = pa.Table.from_pandas(tall, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return path
+
+
+def customer_shards(matrix, n_shards):
+    """Split helper rows into n_shards groups of whole customers, balanced by row count
+
+    Customers are placed largest first into the currently smallest shard, so
+    the partition only depends on the data.
+    """
+    codes = matrix.codes('Customer ID')
+    counts = np.bincount(codes, minlength=len(matrix.categories('Customer ID')))
+    shard_of_customer = np.zeros(len(counts), dtype=np.intp)
+    sizes = np.zeros(n_shards, dtype=np.int64)
+    for customer in np.argsort(-counts, kind='stable'):
+        target = int(np.argmin(sizes))
+        shard_of_customer[customer] = target
+        sizes[target] += counts[customer]
+
+    shard_of_row = shard_of_customer[codes]
+    shards = [np.flatnonzero(shard_of_row == shard) for shard in range(n_shards)]
+    return [rows for rows in shards if len(rows)]
+
+
+def parallel_tall(matrix, quarters, current_quarter, workers=None, sparse=False, min_cells=PARALLEL_MIN_CELLS):
+    """Tall view of matrix built shard-by-shard in a process pool
+
+    Workers build whole shards of the view; the parent concatenates them and
+    reorders the records into sheet order. A single worker, a matrix below
+    min_cells helper/week cells (see PARALLEL_MIN_CELLS) or a missing
+    pyarrow uses to_tall() directly.
+    """
+    workers = workers or os.cpu_count() or 1
+    n_rows, n_weeks = matrix.shape
+    if (workers < 2 or not n_rows or not ARROW_AVAILABLE
+            or min_cells is None or n_rows * n_weeks < min_cells):
+        return matrix.to_tall(quarters, current_quarter, sparse=sparse)
+    shards = customer_shards(matrix, workers * 4)
+
+    arrays = {
+        'constrained': matrix.constrained,
+        'unconstrained': matrix.unconstrained,
+        'price': matrix.price,
+        'unconstrained_price': matrix.unconstrained_price,
+    }
+    arrays.update({'codes:' + name: codes for name, (codes, _) in matrix.dimensions.items()})
+    categories = {name: labels for name, (_, labels) in matrix.dimensions.items()}
+    shared = SharedArrays(arrays)
+    shard_dir = tempfile.TemporaryDirectory(prefix='forecast_shards_')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                                 initargs=(shared.specs, matrix.helpers, matrix.week_columns,
+                                           categories, list(quarters), current_quarter)) as pool:
+            futures = [pool.submit(_transform_shard, rows, sparse, os.path.join(shard_dir.name, f"{i}.arrow"))
+                       for i, rows in enumerate(shards)]
+            tables = [pa.ipc.open_file(pa.memory_map(future.result())).read_all() for future in futures]
+        return _sheet_order(tables, shards, matrix, quarters, current_quarter, sparse)
+    finally:
+        shared.close()
+        shard_dir.cleanup()
+
+
+def _sheet_order(tables, shards, matrix, quarters, current_quarter, sparse):
+    """Splice shard views into sheet order
+
+    Zero-copy slices, one per run of consecutive helper rows from the same
+    shard: a few per shard when the sheet is sorted by customer.
+    """
+    n_rows, n_weeks = matrix.shape
+    records_per_row = (matrix.nonzero_cells().sum(axis=1) if sparse else np.full(n_rows, n_weeks)) * 2
+    shard_of_row = np.empty(n_rows, dtype=np.intp)
+    position = np.empty(n_rows, dtype=np.intp)   # row's block in its shard
+    offsets = []
+    for shard, rows in enumerate(shards):
+        shard_of_row[rows] = shard
+        position[rows] = np.arange(len(rows))
+        offsets.append(np.concatenate([[0], np.cumsum(records_per_row[rows])]))
+    breaks = np.flatnonzero((np.diff(shard_of_row) != 0) | (np.diff(position) != 1)) + 1
+    pieces = []
+    for start, stop in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [n_rows]])):
+        shard = shard_of_row[start]
+        first, last = offsets[shard][position[start]], offsets[shard][position[stop - 1] + 1]
+        if last > first:
+            pieces.append(tables[shard].slice(first, last - first))
+    if not pieces:   # sparse and all zero: no text columns to type
+        return matrix.to_tall(quarters, current_quarter, sparse=True)
+    return pa.concat_tables(pieces).to_pandas()
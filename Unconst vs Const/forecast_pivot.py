@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - ACCT SKU ANALYSIS PIVOT
+Builds the "Acct SKU Analysis" pivot (SUM of Delta Units / SUM of Delta
+Revenue of the supply gap rows by Customer / Anker SKU / PDT, one column
+pair per quarter plus a Grand Total) straight from the forecast matrix,
+instead of pivoting the tall Looker view in Sheets. The Battery supply
+shortage / DP's comment columns are joined from a side table by helper key,
+e.g. last week's pivot export.
+"""
+
+import csv
+import re
+
+import numpy as np
+import pandas as pd
+
+PIVOT_MEASURES = ['SUM of Delta Units', 'SUM of Delta Revenue']
+
+# Header names as they appear in the sheet (the trailing space included)
+COMMENT_COLUMNS = ['Battery supply shortage ', "DP's comment"]
+
+HELPER_KEY = re.compile(r'^\d+[A-Za-z]\S*$')  # Customer ID + Anker SKU, e.g. 1473B2698H21
+
+
+def quarter_pivot(matrix, quarters):
+    """Pivot of the supply gap cells of a ForecastMatrix; quarters labels each week column
+
+    Returns a DataFrame indexed by (Customer, Anker SKU, PDT, Helper) with
+    (Quarter, measure) columns, blank (NaN) where a row has no gap in a
+    quarter. Helper is the first helper of each row, for joining comments.
+    Customers come in order of total revenue impact (largest gap first),
+    and rows within a customer likewise.
+    """
+    # Quarters in calendar order
+    week_order = np.argsort(matrix.weeks, kind='stable')
+    quarter_codes, labels = pd.factorize(np.asarray(quarters, dtype=object)[week_order])
+    onehot = np.zeros((len(week_order), len(labels)))
+    onehot[week_order, quarter_codes] = 1
+
+    # helpers x quarters sums of the gap cells, all quarters in one product
+    gaps = matrix.gap_mask
+    units = np.where(gaps, matrix.delta_units, 0) @ onehot
+    revenue = np.where(gaps, matrix.delta_revenue, 0) @ onehot
+    cells = gaps.astype(np.float64) @ onehot
+
+    # Helper rows -> Customer / SKU / PDT rows (missing PDT is a row of its own, as in Sheets)
+    rows = np.flatnonzero(cells.sum(axis=1) > 0)
+    key = np.zeros(len(rows), dtype=np.int64)
+    for name in ('Customer', 'Anker SKU', 'PDT'):
+        key = key * len(matrix.categories(name)) + matrix.codes(name)[rows]
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_groups = len(first)
+
+    sums = {}
+    for name, values in (('units', units), ('revenue', revenue), ('cells', cells)):
+        sums[name] = np.zeros((n_groups, len(labels)))
+        np.add.at(sums[name], inverse, values[rows])
+
+    group_rows = rows[first]
+    customer = matrix.codes('Customer')[group_rows]
+    group_revenue = sums['revenue'].sum(axis=1)
+    customer_revenue = np.bincount(customer, weights=group_revenue, minlength=len(matrix.categories('Customer')))
+    order = np.lexsort((group_revenue, customer, customer_revenue[customer]))
+
+    blank = sums['cells'][order] == 0
+    columns = {}
+    for q, label in enumerate(labels):
+        columns[(label, PIVOT_MEASURES[0])] = np.where(blank[:, q], np.nan, sums['units'][order, q])
+        columns[(label, PIVOT_MEASURES[1])] = np.where(blank[:, q], np.nan, sums['revenue'][order, q])
+    columns[('Grand Total', PIVOT_MEASURES[0])] = sums['units'][order].sum(axis=1)
+    columns[('Grand Total', PIVOT_MEASURES[1])] = group_revenue[order]
+
+    group_rows = group_rows[order]
+    index = pd.MultiIndex.from_arrays(
+        [matrix.values('Customer')[group_rows], matrix.values('Anker SKU')[group_rows],
+         matrix.values('PDT')[group_rows], matrix.helpers[group_rows]],
+        names=['Customer', 'Anker SKU', 'PDT', 'Helper'])
+    pivot = pd.DataFrame(columns, index=index)
+    pivot.columns = pd.MultiIndex.from_tuples(pivot.columns, names=['Quarter', 'Values'])
+    return pivot
+
+
+def read_comments(source):
+    """Comment side table: helper key -> COMMENT_COLUMNS
+
+    source is a DataFrame or CSV path, either a plain table with a 'Helper'
+    (or 'Important Helper') column, or a previous pivot export, where the
+    header row is found by the comment columns and the helper key column by
+    its values.
+    """
+    names = {name.strip(): name for name in COMMENT_COLUMNS}
+    if isinstance(source, pd.DataFrame):
+        table = source.astype(object)
+    else:
+        raw = pd.read_csv(source, header=None, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+        header_row = next((i for i, row in raw.head(10).iterrows()
+                           if any(value.strip() in names for value in row)), 0)
+        table = raw.iloc[header_row + 1:].copy()
+        table.columns = [value if value else f"Column {i}" for i, value in enumerate(raw.iloc[header_row])]
+    table = table.rename(columns=lambda column: names.get(str(column).strip(), column))
+
+    labels = list(table.columns)
+    key = next((labels.index(name) for name in ('Helper', 'Important Helper') if name in labels), None)
+    if key is None:
+        matches = [table.iloc[:, i].astype(str).str.match(HELPER_KEY).sum() for i in range(len(labels))]
+        key = int(np.argmax(matches))
+        if matches[key] == 0:
+            raise ValueError("Could not find a helper key column in the comment table")
+
+    comments = pd.DataFrame({name: table.iloc[:, labels.index(name)] for name in COMMENT_COLUMNS if name in labels})
+    comments.index = pd.Index(table.iloc[:, key].astype(str).str.strip(), name='Helper')
+    comments = comments.replace('', np.nan)
+    comments = comments[comments.index != ''].dropna(how='all')
+    return comments[~comments.index.duplicated(keep='last')].reindex(columns=COMMENT_COLUMNS)
+
+
+def join_comments(pivot, comments):
+    """Pivot with the comment columns joined by helper key (blank where none)"""
+    joined = pivot.copy()
+    helpers = pivot.index.get_level_values('Helper').astype(str)
+    for column in COMMENT_COLUMNS:
+        values = comments[column] if comments is not None and column in comments else pd.Series(dtype=object)
+        joined[(column, '')] = values.reindex(helpers).to_numpy(dtype=object)
+    return joined
+
+
+def pivot_rows(pivot):
+    """The pivot as sheet rows: three header rows, customer blocks with a
+    '<Customer> Total' row each, and a closing Grand Total row"""
+    value_columns = [column for column in pivot.columns if column[1] in PIVOT_MEASURES]
+    comment_columns = [column for column in pivot.columns if column[0] in COMMENT_COLUMNS]
+    labels = list(dict.fromkeys(quarter for quarter, _ in value_columns))
+
+    rows = [
+        ['', '', '', 'Quarter', 'Values'] + [''] * (len(value_columns) - 2 + len(comment_columns) + 1),
+        ['', '', ''] + [value for label in labels for value in (label, '')] + [''] * (len(comment_columns) + 1),
+        ['Customer', 'Anker SKU', 'PDT'] + [measure for _, measure in value_columns]
+        + [column for column, _ in comment_columns] + ['Helper'],
+    ]
+
+    def totals(frame):
+        return [frame[column].sum(min_count=1) for column in value_columns]
+
+    customers = pivot.index.get_level_values('Customer')
+    for customer in pd.unique(customers):
+        block = pivot[customers == customer]
+        for i, ((_, sku, pdt, helper), row) in enumerate(block.iterrows()):
+            rows.append([customer if i == 0 else '', sku, pdt]
+                        + [row[column] for column in value_columns]
+                        + [row[column] for column in comment_columns] + [helper])
+        rows.append([f"{customer} Total", '', ''] + totals(block) + [''] * (len(comment_columns) + 1))
+    rows.append(['Grand Total', '', ''] + totals(pivot) + [''] * (len(comment_columns) + 1))
+    return rows
+
+
+def _sheet_value(value, measure):
+    """Cell text as in the Sheets export ('-108,150.00', '-$2,886,523.50')"""
+    if not isinstance(value, (float, np.floating)):
+        return '' if value is None else value
+    if np.isnan(value):
+        return ''
+    if measure == PIVOT_MEASURES[1]:
+        return f"{'-' if value < 0 else ''}${abs(value):,.2f}"
+    return f"{value:,.2f}"
+
+
+def save_pivot(pivot, output_file):
+    """Save the pivot in the sheet layout: formatted text for .csv, numbers with formats for .xlsx"""
+    rows = pivot_rows(pivot)
+    measures = rows[2]
+    if output_file.lower().endswith('.csv'):
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerows(rows[:3])
+            writer.writerows([[_sheet_value(value, measure) for value, measure in zip(row, measures)]
+                              for row in rows[3:]])
+    else:
+        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            pd.DataFrame(rows).to_excel(writer, sheet_name='Acct_SKU_Analysis', index=False, header=False)
+            sheet = writer.sheets['Acct_SKU_Analysis']
+            for j, measure in enumerate(measures):
+                if measure in PIVOT_MEASURES:
+                    number_format = '$#,##0.00' if measure == PIVOT_MEASURES[1] else '#,##0.00'
+                    for cell in next(sheet.iter_cols(min_col=j + 1, max_col=j + 1, min_row=4)):
+                        cell.number_format = number_format
+    print(f"✓ Saved quarter pivot to {output_file}")
+    return output_file
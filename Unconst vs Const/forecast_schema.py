@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - SHEET / COLUMN RESOLVER
+Finds the constrained and unconstrained sheets, then probes only the first
+few rows of each to locate the header row, the identity columns (by name,
+falling back to the classic positions) and the 202xxx week columns. The
+result is an exact column plan for the loader; every loaded sheet comes
+out in one canonical column layout, whatever the source layout was.
+"""
+
+import numpy as np
+import pandas as pd
+
+PROBE_ROWS = 10
+
+CONSTRAINED_SHEET_NAMES = ('Constrained Wide', 'NEW WIDE CONSTRAINED FCST DATA',
+                           'Constrained Forecast - "Confirm', 'CONSTRAINED')
+UNCONSTRAINED_SHEET_NAMES = ('Unconstrained Wide', 'NEW WIDE UNCONST. FCST DATA',
+                             'Unconstrained Forecast - "Optim', 'UNCONSTRAINED')
+
+# Canonical layout handed to the transform; positions 0/3/4/5/6 are what
+# ForecastMatrix.from_wide reads, so this order must not change.
+CANONICAL_COLUMNS = ['Important Helper', 'Sell-in Price', 'PCT', 'PDT',
+                     'Customer ID', 'Customer', 'Anker SKU', 'SKU Description']
+
+# Normalized header names accepted for each canonical column
+COLUMN_ALIASES = {
+    'Important Helper': ('important helper', 'helper'),
+    'Sell-in Price': ('sell-in price', 'sell in price', 'sellin price'),
+    'PCT': ('pct',),
+    'PDT': ('pdt',),
+    'Customer ID': ('customer id', 'id'),
+    'Customer': ('customer', 'customer name'),
+    'Anker SKU': ('anker sku', 'sku'),
+    'SKU Description': ('sku description', 'description'),
+}
+
+# Columns a sheet cannot be transformed without: no helper key, or revenue
+# that would silently come out 0
+REQUIRED_COLUMNS = ('Important Helper', 'Sell-in Price')
+
+# Positions used by the original loader when a header name is not recognized
+# (and no other column or week already sits there)
+LEGACY_POSITIONS = {'Important Helper': 0, 'PCT': 2, 'PDT': 3, 'Customer ID': 4,
+                    'Customer': 5, 'Anker SKU': 6, 'SKU Description': 7}
+
+_schema_cache = {}
+
+
+def normalize_label(label):
+    """Header label for matching: stripped, lower case, single spaces, no BOM"""
+    if label is None or (isinstance(label, float) and np.isnan(label)):
+        return ''
+    return ' '.join(str(label).replace('﻿', '').strip().lower().split())
+
+
+def week_code(label):
+    """Week code of a 202xxx header label (int, str or float cell), else None"""
+    if isinstance(label, float) and label.is_integer():
+        label = int(label)
+    text = str(label).strip() if label is not None else ''
+    if text.isdigit() and text.startswith('202') and len(text) == 6:
+        return int(text)
+    return None
+
+
+def resolve_sheet_names(available):
+    """(constrained, unconstrained) sheet names among the available ones
+
+    Known names first (exact, then case-insensitive), then any sheet whose
+    name mentions UNCONST / CONSTRAINED.
+    """
+    by_upper = {name.upper(): name for name in available}
+
+    def pick(known, matches):
+        for name in known:
+            if name in available:
+                return name
+        for name in known:
+            if name.upper() in by_upper:
+                return by_upper[name.upper()]
+        return next((name for name in available if matches(name.upper())), None)
+
+    unconstrained = pick(UNCONSTRAINED_SHEET_NAMES, lambda name: 'UNCONST' in name)
+    constrained = pick(CONSTRAINED_SHEET_NAMES,
+                       lambda name: 'CONSTRAINED' in name and 'UNCONST' not in name)
+    if constrained is None or unconstrained is None:
+        raise ValueError(f"Could not find constrained/unconstrained sheets. Available sheets: {list(available)}")
+    return constrained, unconstrained
+
+
+class SheetSchema:
+    """Resolved layout of one wide sheet"""
+
+    def __init__(self, header_row, header, identity, weeks):
+        self.header_row = header_row        # 0-based row index of the header
+        self.header = header                # raw header labels
+        self.identity = identity            # canonical column -> position (None if absent)
+        self.weeks = weeks                  # [(position, original label)] of week columns
+
+    @property
+    def positions(self):
+        """Every column position the loader has to read, ascending"""
+        found = [position for position in self.identity.values() if position is not None]
+        return sorted(set(found + [position for position, _ in self.weeks]))
+
+    @property
+    def last_column(self):
+        return max(self.positions) + 1 if self.positions else 1
+
+    def frame(self, columns, n_rows):
+        """Canonical DataFrame from {position: list of cell values}"""
+        data = {}
+        for name in CANONICAL_COLUMNS:
+            position = self.identity[name]
+            values = columns[position] if position is not None else [None] * n_rows
+            if name == 'Sell-in Price':
+                data[name] = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype(np.float64)
+            else:
+                data[name] = pd.Series(values, dtype=object).infer_objects()
+        for position, label in self.weeks:
+            data[label] = pd.to_numeric(pd.Series(columns[position], dtype=object),
+                                        errors='coerce').astype(np.float64)
+        return pd.DataFrame(data, index=pd.RangeIndex(n_rows))
+
+    def frame_from_rows(self, rows):
+        """Canonical DataFrame from data rows (tuples of cell values)"""
+        columns = {position: [row[position] if position < len(row) else None for row in rows]
+                   for position in self.positions}
+        return self.frame(columns, len(rows))
+
+
+def sniff_schema(probe_rows):
+    """Locate header row, identity and week columns from the first rows of a sheet
+
+    The header is the probed row with the most recognized identity names
+    plus week labels. Results are cached by the probed header, so sheets
+    sharing a layout are resolved once. Raises ValueError when the helper
+    or sell-in price column cannot be found.
+    """
+    best_row, best_score = 0, -1
+    for i, row in enumerate(probe_rows[:PROBE_ROWS]):
+        labels = [normalize_label(label) for label in row]
+        names = sum(any(label in aliases for label in labels) for aliases in COLUMN_ALIASES.values())
+        weeks = sum(week_code(label) is not None for label in row)
+        if names + weeks > best_score:
+            best_row, best_score = i, names + weeks
+
+    header = list(probe_rows[best_row]) if probe_rows else []
+    cache_key = (best_row, tuple(str(label) for label in header))
+    if cache_key in _schema_cache:
+        return _schema_cache[cache_key]
+
+    weeks = []
+    seen_codes = set()
+    for position, label in enumerate(header):
+        code = week_code(label)
+        if code is not None and code not in seen_codes:
+            seen_codes.add(code)
+            weeks.append((position, label if isinstance(label, (int, str)) else code))
+
+    # Names first; legacy positions only fill in columns no name or week claimed
+    labels = [normalize_label(label) for label in header]
+    identity = {name: next((i for i, label in enumerate(labels) if label in aliases), None)
+                for name, aliases in COLUMN_ALIASES.items()}
+    claimed = {position for position in identity.values() if position is not None}
+    claimed.update(position for position, label in enumerate(header) if week_code(label) is not None)
+    for name, position in identity.items():
+        legacy = LEGACY_POSITIONS.get(name)
+        if position is None and legacy is not None and legacy < len(header) and legacy not in claimed:
+            identity[name] = legacy
+            claimed.add(legacy)
+
+    missing = [name for name in REQUIRED_COLUMNS if identity[name] is None]
+    if missing:
+        raise ValueError(f"Could not find column(s) {missing} in header row {best_row + 1}: {header}")
+    for name in ('Customer', 'Anker SKU'):
+        if identity[name] is None:
+            print(f"⚠️ No '{name}' column in header row {best_row + 1}; every row will be dropped")
+
+    schema = SheetSchema(best_row, header, identity, weeks)
+    _schema_cache[cache_key] = schema
+    return schema
+
+
+def canonicalize_frame(df):
+    """Canonical layout for a DataFrame read with its own header (e.g. pd.read_excel)"""
+    if list(df.columns[:len(CANONICAL_COLUMNS)]) == CANONICAL_COLUMNS:
+        return df
+    rows = [list(df.columns)] + df.head(PROBE_ROWS - 1).astype(object).values.tolist()
+    schema = sniff_schema(rows)
+    body = df.iloc[schema.header_row:].astype(object)  # probe row i is data row i - 1
+    columns = {position: body.iloc[:, position].tolist() for position in schema.positions}
+    return schema.frame(columns, len(body))
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - BULK SHEETS UPLOAD
+Uploads large tables to Google Sheets as a series of size-bounded range
+writes (spreadsheets.values.update) instead of one huge request:
+
+- every request holds at most max_cells cells / max_bytes of JSON
+- requests run on a few worker threads under a token-bucket limiter that
+  keeps them within the per-minute write quota
+- 429 and 5xx responses (and dropped connections) are retried with
+  exponential backoff, honouring Retry-After
+- the number of leading chunks acknowledged is saved to a progress file,
+  so a failed upload resumes from the last acknowledged chunk
+
+sync() instead keeps a manifest of hashes of fixed-size row blocks, writes
+only the blocks that changed since the last sync (batched into
+values.batchUpdate requests) and clears the rows past the end when the
+table got shorter. The sheet is never cleared as a whole, so readers never
+see it empty. sync_tables() does the same for several sheets at once (the
+Looker view and the summary tabs), packing their changed blocks into
+shared requests, and ensure_sheets() creates missing worksheets and grows
+small ones in a single spreadsheets.batchUpdate.
+
+The spreadsheet can be a gspread Spreadsheet or an HttpSpreadsheet, a small
+REST client for the same values API that also talks to the local stand-in
+server in forecast_sheets_standin.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+SHEETS_API = 'https://sheets.googleapis.com/v4/spreadsheets'
+
+MAX_CELLS = 50000            # cells per values.update request
+MAX_BYTES = 2000000          # JSON payload per request (Google recommends <= 2 MB)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class SheetsApiError(Exception):
+    """Error response from the Sheets API"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class HttpSpreadsheet:
+    """Minimal Sheets v4 REST client with the gspread Spreadsheet method names
+
+    token is an OAuth access token (None for the local stand-in).
+    """
+
+    def __init__(self, spreadsheet_id, base_url=SHEETS_API, token=None, timeout=60):
+        self.id = spreadsheet_id
+        self.url = f"{base_url.rstrip('/')}/{urllib.parse.quote(spreadsheet_id)}"
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method, path, params=None, body=None):
+        url = self.url + path + ('?' + urllib.parse.urlencode(params) if params else '')
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(url, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            message = e.read().decode('utf-8', 'replace')
+            try:
+                message = json.loads(message)['error']['message']
+            except (ValueError, KeyError, TypeError):
+                pass
+            retry_after = e.headers.get('Retry-After')
+            raise SheetsApiError(e.code, message, float(retry_after) if retry_after else None) from None
+
+    def values_update(self, range, params=None, body=None):
+        return self._request('PUT', '/values/' + urllib.parse.quote(range), params, body)
+
+    def values_batch_update(self, body=None):
+        return self._request('POST', '/values:batchUpdate', body=body)
+
+    def values_batch_clear(self, params=None, body=None):
+        return self._request('POST', '/values:batchClear', params, body)
+
+    def fetch_sheet_metadata(self, params=None):
+        return self._request('GET', '', params)
+
+    def batch_update(self, body):
+        return self._request('POST', ':batchUpdate', body=body)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, bursts of up to capacity"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available and take them"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_time = (tokens - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def column_letters(column):
+    """1 -> A, 27 -> AA"""
+    letters = ''
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def a1_range(sheet_name, row=None, column=1, end=None):
+    """A1 range on a sheet, e.g. 'Looker_Ready_View_Python'!A2
+
+    end is an optional (row, column) end cell; its row may be None for an
+    open-ended range ('Sheet'!A10:N). Without a row the range is the whole
+    sheet.
+    """
+    quoted = "'{}'".format(sheet_name.replace("'", "''"))
+    if row is None:
+        return quoted
+    a1 = f"{quoted}!{column_letters(column)}{row}"
+    if end is not None:
+        a1 += f":{column_letters(end[1])}{end[0] if end[0] is not None else ''}"
+    return a1
+
+
+def sheet_values(frame):
+    """Rows of a DataFrame as JSON-ready Python values, missing values blank"""
+    columns = []
+    for name in frame.columns:
+        series = frame[name]
+        values = series.to_numpy(dtype=object).tolist()
+        missing = pd.isna(series.to_numpy())
+        if missing.any():
+            for i in np.flatnonzero(missing):
+                values[i] = ''
+        columns.append(values)
+    return [list(row) for row in zip(*columns)]
+
+
+def _rows(frames, header=True):
+    """Sheet rows of DataFrame chunks, led by a header row if header=True"""
+    for i, frame in enumerate(frames):
+        if header and i == 0:
+            yield [str(name) for name in frame.columns]
+        yield from sheet_values(frame)
+
+
+def value_chunks(frames, header=True, max_cells=MAX_CELLS, max_bytes=MAX_BYTES):
+    """Split DataFrame chunks into lists of rows of at most max_cells cells / max_bytes JSON
+
+    The header row (if header=True) is the first row of the first chunk.
+    Chunk boundaries depend only on the data and the limits, so they are the
+    same on every run of the same table.
+    """
+    rows, cells, size = [], 0, 0
+    for row in _rows(frames, header):
+        row_size = len(json.dumps(row)) + 1
+        if rows and (cells + len(row) > max_cells or size + row_size > max_bytes):
+            yield rows
+            rows, cells, size = [], 0, 0
+        rows.append(row)
+        cells += len(row)
+        size += row_size
+    if rows:
+        yield rows
+
+
+def row_blocks(frames, header=True, block_rows=100):
+    """(rows, hash, JSON size) of consecutive blocks of block_rows sheet rows"""
+    block = []
+    for row in _rows(frames, header):
+        block.append(row)
+        if len(block) == block_rows:
+            yield _hashed(block)
+            block = []
+    if block:
+        yield _hashed(block)
+
+
+def _hashed(block):
+    text = json.dumps(block)
+    return block, hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest(), len(text)
+
+
+def _status(error):
+    """HTTP status of a SheetsApiError or gspread APIError (None for other errors)"""
+    status = getattr(error, 'status', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(error):
+    retry_after = getattr(error, 'retry_after', None)
+    response = getattr(error, 'response', None)
+    if retry_after is None and response is not None:
+        try:
+            retry_after = float(response.headers.get('Retry-After'))
+        except (AttributeError, TypeError, ValueError):
+            retry_after = None
+    return retry_after
+
+
+def is_retryable(error):
+    """Rate limit, server errors and dropped connections are worth retrying"""
+    status = _status(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError))
+
+
+class BulkUploader:
+    """Chunked, rate-limited, retrying and resumable values uploads
+
+    rate is write requests per second (Sheets allows 60 per minute per user
+    by default), burst the token bucket size, workers the number of requests
+    in flight. progress_file records the acknowledged chunks for resuming.
+    """
+
+    def __init__(self, spreadsheet, rate=1.0, burst=10, workers=4, max_retries=6,
+                 backoff=1.0, max_backoff=64.0, max_cells=MAX_CELLS, max_bytes=MAX_BYTES,
+                 progress_file=None):
+        self.spreadsheet = spreadsheet
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_cells = max_cells
+        self.max_bytes = max_bytes
+        self.progress_file = progress_file
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    # Progress
+    def _progress_key(self, sheet_name, key):
+        return {'sheet': sheet_name, 'key': key, 'max_cells': self.max_cells, 'max_bytes': self.max_bytes}
+
+    def acknowledged(self, sheet_name, key=None):
+        """(chunks, rows) already acknowledged by an earlier run of the same upload"""
+        if not self.progress_file or not os.path.exists(self.progress_file):
+            return 0, 0
+        with open(self.progress_file) as f:
+            progress = json.load(f)
+        if {name: progress.get(name) for name in ('sheet', 'key', 'max_cells', 'max_bytes')} != \
+                self._progress_key(sheet_name, key):
+            return 0, 0
+        return progress['chunks'], progress['rows']
+
+    def _save_progress(self, sheet_name, key, chunks, rows):
+        if not self.progress_file:
+            return
+        progress = dict(self._progress_key(sheet_name, key), chunks=chunks, rows=rows)
+        partial = self.progress_file + '.partial'
+        with open(partial, 'w') as f:
+            json.dump(progress, f)
+        os.replace(partial, self.progress_file)
+
+    def _clear_progress(self):
+        if self.progress_file and os.path.exists(self.progress_file):
+            os.remove(self.progress_file)
+
+    # Requests
+    def call(self, method, *args, **kwargs):
+        """Call a spreadsheet method under the rate limiter, retrying retryable errors"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                result = getattr(self.spreadsheet, method)(*args, **kwargs)
+                with self.lock:
+                    self.stats['requests'] = self.stats.get('requests', 0) + 1
+                return result
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                with self.lock:
+                    self.stats['retries'] = self.stats.get('retries', 0) + 1
+                time.sleep(delay)
+
+    def ensure_sheets(self, sizes):
+        """Create missing sheets and grow small ones in one structural batchUpdate
+
+        sizes maps sheet names to the (rows, columns) they need. Returns the
+        names of the sheets created.
+        """
+        metadata = self.call('fetch_sheet_metadata')
+        existing = {sheet['properties']['title']: sheet['properties'] for sheet in metadata.get('sheets', [])}
+        requests, created = [], []
+        for title, (rows, columns) in sizes.items():
+            properties = existing.get(title)
+            if properties is None:
+                requests.append({'addSheet': {'properties': {
+                    'title': title, 'gridProperties': {'rowCount': rows, 'columnCount': columns}}}})
+                created.append(title)
+                continue
+            grid = properties.get('gridProperties', {})
+            if grid.get('rowCount', 0) < rows or grid.get('columnCount', 0) < columns:
+                requests.append({'updateSheetProperties': {
+                    'properties': {'sheetId': properties['sheetId'], 'gridProperties': {
+                        'rowCount': max(rows, grid.get('rowCount', 0)),
+                        'columnCount': max(columns, grid.get('columnCount', 0))}},
+                    'fields': 'gridProperties(rowCount,columnCount)'}})
+        if requests:
+            self.call('batch_update', {'requests': requests})
+        return created
+
+    def _run(self, requests, acknowledge):
+        """Run (method, args, kwargs, tag) requests on the worker threads
+
+        acknowledge(tag) is called on the calling thread for every request
+        that succeeded. After the first failure no more requests are sent;
+        the requests in flight are waited for and the first error returned
+        (None if all succeeded).
+        """
+        failure = []
+
+        def finished(future):
+            tag = in_flight.pop(future)
+            if future.exception() is not None:
+                failure.append(future.exception())
+            else:
+                acknowledge(tag)
+
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for method, args, kwargs, tag in requests:
+                while len(in_flight) >= self.workers * 2 and not failure:
+                    completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        finished(future)
+                if failure:
+                    break
+                in_flight[executor.submit(self.call, method, *args, **kwargs)] = tag
+            for future in list(in_flight):
+                future.exception()
+                finished(future)
+        return failure[0] if failure else None
+
+    def upload(self, sheet_name, frames, start_row=1, header=True, key=None):
+        """Write DataFrame chunks to sheet_name from start_row on; returns the stats
+
+        Chunks acknowledged by an earlier failed run with the same sheet, key
+        and limits are skipped. On failure the progress is saved and the
+        error re-raised once the requests in flight have finished.
+        """
+        self.stats = {'requests': 0, 'retries': 0, 'chunks': 0, 'rows': 0, 'cells': 0}
+        started = time.perf_counter()
+        done_chunks, done_rows = self.acknowledged(sheet_name, key)
+        if done_chunks:
+            print(f"Resuming upload to {sheet_name} after chunk {done_chunks} (row {start_row + done_rows})")
+
+        acked = {}            # chunk index -> rows, for chunks done out of order
+        prefix = [done_chunks, done_rows]
+
+        def acknowledge(tag):
+            index, n_rows, n_cells = tag
+            self.stats['chunks'] += 1
+            self.stats['rows'] += n_rows
+            self.stats['cells'] += n_cells
+            acked[index] = n_rows
+            while prefix[0] in acked:
+                prefix[1] += acked.pop(prefix[0])
+                prefix[0] += 1
+            self._save_progress(sheet_name, key, *prefix)
+
+        def requests():
+            row = start_row
+            for index, values in enumerate(value_chunks(frames, header, self.max_cells, self.max_bytes)):
+                if index >= done_chunks:
+                    yield ('values_update', (a1_range(sheet_name, row),),
+                           {'params': {'valueInputOption': 'RAW'}, 'body': {'values': values}},
+                           (index, len(values), sum(len(r) for r in values)))
+                row += len(values)
+
+        failure = self._run(requests(), acknowledge)
+        self.stats['seconds'] = time.perf_counter() - started
+        if failure is not None:
+            print(f"❌ Upload to {sheet_name} stopped after chunk {prefix[0]}; "
+                  f"run again to resume from row {start_row + prefix[1]}")
+            raise failure
+        self._clear_progress()
+        return dict(self.stats)
+
+    def sync(self, sheet_name, frames, manifest_file, block_rows=100, header=True):
+        """Bring one sheet up to date with the DataFrame chunks (see sync_tables)"""
+        return self.sync_tables({sheet_name: frames}, manifest_file, block_rows, header)
+
+    def sync_tables(self, tables, manifest_file, block_rows=100, header=True):
+        """Bring sheets up to date with their tables, writing only changed blocks
+
+        tables maps sheet names to a DataFrame or an iterable of DataFrame
+        chunks. Blocks of block_rows rows whose hash matches the manifest
+        entry of the last sync are skipped; the changed blocks of all sheets
+        are packed together into values.batchUpdate requests. Rows past the
+        new end are cleared, in the columns the table spans, when a table
+        got shorter (or, without a manifest, whatever lies past it), in one
+        values.batchClear for all sheets. The manifest describes what this
+        code last wrote, so delete it to force a full rewrite after a sheet
+        was edited by hand. Returns the stats.
+        """
+        self.stats = {'requests': 0, 'retries': 0, 'tables': len(tables), 'blocks': 0, 'changed': 0,
+                      'rows': 0, 'cells': 0, 'total_cells': 0}
+        started = time.perf_counter()
+        manifest = load_manifest(manifest_file)
+
+        states = {}
+        for sheet_name in tables:
+            old = manifest.get(self._manifest_key(sheet_name))
+            if old is not None and old.get('block_rows') != block_rows:
+                old = None
+            states[sheet_name] = {
+                'old': old,
+                'old_hashes': old['hashes'] if old else [],
+                'hashes': [],       # hash of every block of the new table
+                'written': {},      # block index -> hash, for blocks acknowledged
+                'rows': 0,
+                'columns': 0,
+                'truncated': False,
+            }
+
+        def acknowledge(tag):
+            if tag[0] == 'truncate':
+                for sheet_name in tag[1]:
+                    states[sheet_name]['truncated'] = True
+                return
+            for sheet_name, index, digest, n_rows, n_cells in tag[1]:
+                states[sheet_name]['written'][index] = digest
+                self.stats['changed'] += 1
+                self.stats['rows'] += n_rows
+                self.stats['cells'] += n_cells
+
+        def batch_request(batch):
+            return ('values_batch_update', (),
+                    {'body': {'valueInputOption': 'RAW', 'data': [data for data, _ in batch]}},
+                    ('blocks', [blocks for _, blocks in batch]))
+
+        def requests():
+            batch, cells, size = [], 0, 0
+            for sheet_name, frames in tables.items():
+                state = states[sheet_name]
+                frames = [frames] if isinstance(frames, pd.DataFrame) else frames
+                for index, (block, digest, block_size) in enumerate(row_blocks(frames, header, block_rows)):
+                    state['hashes'].append(digest)
+                    block_cells = sum(len(row) for row in block)
+                    state['rows'] += len(block)
+                    state['columns'] = max(state['columns'], max(len(row) for row in block))
+                    self.stats['blocks'] += 1
+                    self.stats['total_cells'] += block_cells
+                    if index < len(state['old_hashes']) and state['old_hashes'][index] == digest:
+                        continue
+                    if batch and (cells + block_cells > self.max_cells or size + block_size > self.max_bytes):
+                        yield batch_request(batch)
+                        batch, cells, size = [], 0, 0
+                    data = {'range': a1_range(sheet_name, index * block_rows + 1), 'values': block}
+                    batch.append((data, (sheet_name, index, digest, len(block), block_cells)))
+                    cells += block_cells
+                    size += block_size
+            if batch:
+                yield batch_request(batch)
+
+            tails, truncated = [], []
+            for sheet_name, state in states.items():
+                old = state['old']
+                if old is None or old['rows'] is None or old['rows'] > state['rows']:
+                    columns = max(state['columns'], old['columns'] if old else 0, 1)
+                    tails.append(a1_range(sheet_name, state['rows'] + 1, 1, (old['rows'] if old else None, columns)))
+                    truncated.append(sheet_name)
+            if tails:
+                yield 'values_batch_clear', (), {'body': {'ranges': tails}}, ('truncate', truncated)
+
+        failure = self._run(requests(), acknowledge)
+        self.stats['seconds'] = time.perf_counter() - started
+
+        for sheet_name, state in states.items():
+            old, old_hashes = state['old'], state['old_hashes']
+            if failure is None:
+                entry = {'block_rows': block_rows, 'rows': state['rows'], 'columns': state['columns'],
+                         'hashes': state['hashes']}
+            else:
+                # Acknowledged blocks hold the new rows, all others still the old ones
+                hashes = [state['written'].get(i, old_hashes[i] if i < len(old_hashes) else None)
+                          for i in range(max(len(state['hashes']), len(old_hashes)))]
+                if state['truncated']:
+                    rows = state['rows']
+                elif old is not None and old['rows'] is not None:
+                    rows = max(old['rows'], state['rows'])
+                else:
+                    rows = None
+                entry = {'block_rows': block_rows, 'rows': rows,
+                         'columns': max(state['columns'], old['columns'] if old else 0), 'hashes': hashes}
+            manifest[self._manifest_key(sheet_name)] = entry
+        save_manifest(manifest_file, manifest)
+
+        if failure is not None:
+            print(f"❌ Sync stopped after {self.stats['changed']} changed blocks; run again to finish")
+            raise failure
+        return dict(self.stats)
+
+    def _manifest_key(self, sheet_name):
+        return f"{getattr(self.spreadsheet, 'id', '')}/{sheet_name}"
+
+    def forget(self, sheet_name, manifest_file):
+        """Drop the manifest entry of a sheet that was rewritten outside sync()"""
+        manifest = load_manifest(manifest_file)
+        if manifest.pop(self._manifest_key(sheet_name), None) is not None:
+            save_manifest(manifest_file, manifest)
+
+
+def load_manifest(manifest_file):
+    """Sync manifest: '<spreadsheet id>/<sheet>' -> block hashes of the last sync"""
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_file, manifest):
+    partial = manifest_file + '.partial'
+    with open(partial, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(partial, manifest_file)
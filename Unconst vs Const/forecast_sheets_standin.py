@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - LOCAL SHEETS API STAND-IN
+A local HTTP server that answers the Sheets v4 calls the uploader uses
+(values.update, values.batchUpdate, values.batchClear, spreadsheets.get
+and the addSheet / updateSheetProperties requests of
+spreadsheets.batchUpdate), keeping each sheet as a grid of rows in memory,
+so throughput and failure handling can be tested offline:
+
+    with SheetsStandIn(['Looker_Ready_View_Python'], failure_rate=0.05, quota=50) as server:
+        spreadsheet = HttpSpreadsheet('test', base_url=server.url)
+        BulkUploader(spreadsheet, rate=40, backoff=0.05).upload('Looker_Ready_View_Python', chunks)
+        server.sheets['Looker_Ready_View_Python']    # rows as written
+
+Like a new Google sheet, a sheet starts with 1000 x 26 cells and writes
+past its grid are rejected until it is resized.
+failure_rate answers that share of requests with a random 429/500/503,
+quota (requests per second) answers 429 with Retry-After beyond it,
+latency delays every response, and fail_after turns the server into a
+permanent 503 after that many successful writes.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CELL = re.compile(r'^([A-Z]+)(\d*)$')
+MAX_COLUMNS = 18278         # ZZZ
+DEFAULT_GRID = (1000, 26)   # rows, columns of a new sheet
+
+
+def _cell(cell, a1):
+    """'B12' -> (row index or None, column index), both 0-based"""
+    match = CELL.match(cell)
+    if not match:
+        raise ValueError(f"Unable to parse range: {a1}")
+    column = 0
+    for letter in match.group(1):
+        column = column * 26 + ord(letter) - 64
+    return (int(match.group(2)) - 1 if match.group(2) else None), column - 1
+
+
+def parse_range(a1):
+    """'Sheet Name'!B12:D20 -> ('Sheet Name', (row, column), (row, column) or None)
+
+    Indexes are 0-based; the end row is None for open-ended ranges (A10:N).
+    A bare sheet name is the whole sheet.
+    """
+    if '!' not in a1:
+        sheet = a1[1:-1].replace("''", "'") if a1.startswith("'") and a1.endswith("'") else a1
+        return sheet, (0, 0), (None, MAX_COLUMNS - 1)
+    sheet, _, cells = a1.rpartition('!')
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    start, _, end = cells.partition(':')
+    start = _cell(start, a1)
+    if not sheet or start[0] is None:
+        raise ValueError(f"Unable to parse range: {a1}")
+    return sheet, start, _cell(end, a1) if end else None
+
+
+class SheetsStandIn:
+    """In-memory Sheets values API on a local port (see module docstring)"""
+
+    def __init__(self, sheet_names=(), failure_rate=0.0, quota=None, latency=0.0, fail_after=None, seed=0):
+        self.sheets = {}
+        self.properties = {}
+        for name in sheet_names:
+            self.add_sheet(name)
+        self.failure_rate = failure_rate
+        self.quota = quota
+        self.latency = latency
+        self.fail_after = fail_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = []                # request times within the last second
+        self.stats = {'requests': 0, 'writes': 0, 'cells': 0, 'structural': 0, 'errors': {}}
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v4/spreadsheets"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Fault injection
+    def _injected_error(self):
+        """(status, retry_after) to answer instead of serving the request, or None"""
+        with self.lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if self.fail_after is not None and self.stats['writes'] >= self.fail_after:
+                return 503, None
+            if self.quota is not None:
+                self.window = [t for t in self.window if now - t < 1.0]
+                if len(self.window) >= self.quota:
+                    return 429, 1.0 - (now - self.window[0])
+                self.window.append(now)
+            if self.random.random() < self.failure_rate:
+                return self.random.choice((429, 500, 503)), None
+        return None
+
+    # Grid operations
+    def add_sheet(self, title, rows=DEFAULT_GRID[0], columns=DEFAULT_GRID[1]):
+        self.sheets[title] = []
+        self.properties[title] = {'sheetId': len(self.properties), 'title': title, 'index': len(self.properties),
+                                  'gridProperties': {'rowCount': rows, 'columnCount': columns}}
+
+    def structural_update(self, requests):
+        """Apply addSheet / updateSheetProperties requests, all or none"""
+        with self.lock:
+            titles = set(self.sheets)
+            ids = {properties['sheetId']: title for title, properties in self.properties.items()}
+            for request in requests:
+                if 'addSheet' in request:
+                    title = request['addSheet']['properties']['title']
+                    if title in titles:
+                        raise ValueError(f"A sheet with the name \"{title}\" already exists")
+                    titles.add(title)
+                elif 'updateSheetProperties' in request:
+                    if request['updateSheetProperties']['properties']['sheetId'] not in ids:
+                        raise ValueError("No grid with the given sheetId")
+                else:
+                    raise ValueError(f"Unsupported request: {sorted(request)}")
+            replies = []
+            for request in requests:
+                if 'addSheet' in request:
+                    properties = request['addSheet']['properties']
+                    grid = properties.get('gridProperties', {})
+                    self.add_sheet(properties['title'], grid.get('rowCount', DEFAULT_GRID[0]),
+                                   grid.get('columnCount', DEFAULT_GRID[1]))
+                    replies.append({'addSheet': {'properties': self.properties[properties['title']]}})
+                else:
+                    properties = request['updateSheetProperties']['properties']
+                    grid = self.properties[ids[properties['sheetId']]]['gridProperties']
+                    grid.update(properties.get('gridProperties', {}))
+                    replies.append({})
+            self.stats['structural'] += 1
+        return replies
+
+    def metadata(self):
+        with self.lock:
+            return {'sheets': [{'properties': dict(properties)} for properties in self.properties.values()]}
+
+    def write(self, a1, values):
+        """Write rows of values at the start cell of an A1 range; returns cells written"""
+        sheet, (row, column), _ = parse_range(a1)
+        with self.lock:
+            if sheet not in self.sheets:
+                raise KeyError(sheet)
+            grid = self.properties[sheet]['gridProperties']
+            width = max((len(values_row) for values_row in values), default=0)
+            if row + len(values) > grid['rowCount'] or column + width > grid['columnCount']:
+                raise ValueError(f"Range ({a1}) exceeds grid limits. Max rows: {grid['rowCount']}, "
+                                 f"max columns: {grid['columnCount']}")
+            grid = self.sheets[sheet]
+            for offset, values_row in enumerate(values):
+                while len(grid) <= row + offset:
+                    grid.append([])
+                target = grid[row + offset]
+                if len(target) < column + len(values_row):
+                    target.extend([''] * (column + len(values_row) - len(target)))
+                target[column:column + len(values_row)] = values_row
+            cells = sum(len(values_row) for values_row in values)
+            self.stats['writes'] += 1
+            self.stats['cells'] += cells
+        return cells
+
+    def clear(self, a1):
+        """Blank the cells of an A1 range; trailing empty rows are dropped, as values.get does"""
+        sheet, (row, column), end = parse_range(a1)
+        with self.lock:
+            if sheet not in self.sheets:
+                raise KeyError(sheet)
+            grid = self.sheets[sheet]
+            end_row, end_column = end if end is not None else (row, column)
+            stop = len(grid) if end_row is None else min(end_row + 1, len(grid))
+            for target in grid[row:stop]:
+                for j in range(column, min(end_column + 1, len(target))):
+                    target[j] = ''
+            while grid and not any(value != '' for value in grid[-1]):
+                grid.pop()
+            self.stats['clears'] = self.stats.get('clears', 0) + 1
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, retry_after=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if retry_after is not None:
+                    self.send_header('Retry-After', f"{max(retry_after, 0):.3f}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _error(self, status, message, retry_after=None):
+                with standin.lock:
+                    standin.stats['errors'][status] = standin.stats['errors'].get(status, 0) + 1
+                self._send(status, {'error': {'code': status, 'message': message}}, retry_after)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_PUT(self):
+                body = self._body()
+                if standin.latency:
+                    time.sleep(standin.latency)
+                injected = standin._injected_error()
+                if injected:
+                    return self._error(injected[0], 'Injected failure', injected[1])
+
+                path = urllib.parse.urlparse(self.path).path
+                _, _, a1 = path.partition('/values/')
+                a1 = urllib.parse.unquote(a1)
+                try:
+                    cells = standin.write(a1, body.get('values', []))
+                except KeyError as e:
+                    return self._error(400, f"Unable to parse range: {e}")
+                except ValueError as e:
+                    return self._error(400, str(e))
+                self._send(200, {'updatedRange': a1, 'updatedRows': len(body.get('values', [])),
+                                 'updatedCells': cells})
+
+            def do_GET(self):
+                if standin.latency:
+                    time.sleep(standin.latency)
+                injected = standin._injected_error()
+                if injected:
+                    return self._error(injected[0], 'Injected failure', injected[1])
+                self._send(200, standin.metadata())
+
+            def do_POST(self):
+                body = self._body()
+                if standin.latency:
+                    time.sleep(standin.latency)
+                injected = standin._injected_error()
+                if injected:
+                    return self._error(injected[0], 'Injected failure', injected[1])
+
+                path = urllib.parse.urlparse(self.path).path
+                try:
+                    if path.endswith('/values:batchUpdate'):
+                        # All ranges are checked first: a batch is applied whole or not at all
+                        for data in body.get('data', []):
+                            sheet, (row, column), _ = parse_range(data['range'])
+                            grid = standin.properties[sheet]['gridProperties']
+                            width = max((len(values_row) for values_row in data.get('values', [])), default=0)
+                            if (row + len(data.get('values', [])) > grid['rowCount']
+                                    or column + width > grid['columnCount']):
+                                raise ValueError(f"Range ({data['range']}) exceeds grid limits")
+                        cells = sum(standin.write(data['range'], data.get('values', []))
+                                    for data in body.get('data', []))
+                        return self._send(200, {'totalUpdatedCells': cells})
+                    if path.endswith('/values:batchClear'):
+                        for a1 in body.get('ranges', []):
+                            standin.clear(a1)
+                        return self._send(200, {'clearedRanges': body.get('ranges', [])})
+                    if path.endswith(':batchUpdate'):
+                        return self._send(200, {'replies': standin.structural_update(body.get('requests', []))})
+                except KeyError as e:
+                    return self._error(400, f"Unable to parse range: {e}")
+                except ValueError as e:
+                    return self._error(400, str(e))
+                self._error(404, f"Unknown method: {path}")
+
+        return Handler
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - BINARY SNAPSHOTS
+Compact on-disk snapshot of a parsed FC version (*.fcsnap) that opens with a
+memory map instead of re-reading the workbook. Layout:
+
+    8 bytes   magic b'FCSNAP02'
+    8 bytes   header length (little-endian uint64)
+    header    JSON: label, helpers, week labels, dimension dictionaries and
+              the offset/dtype/shape of every array
+    arrays    64-byte aligned raw arrays:
+              constrained, unconstrained   float64, stored week-major (weeks x helpers)
+              price, unconstrained_price   float64 (helpers,)
+              codes:<dimension>            int32 (helpers,)
+
+Week-major storage keeps each week's values contiguous, so a reader that
+touches a few weeks only pages in those weeks. Values are stored as the
+float64 of the forecast matrix, so a snapshot round-trips exactly (the
+fractional units of allocated forecasts do not survive float32).
+Version 1 files (b'FCSNAP01', float32 arrays) can still be read.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from forecast_matrix import ForecastMatrix
+
+MAGIC = b'FCSNAP02'
+READABLE_MAGICS = (MAGIC, b'FCSNAP01')
+ALIGNMENT = 64
+SNAPSHOT_EXTENSION = '.fcsnap'
+
+
+def _json_value(value):
+    """Dimension value as JSON (NaN -> None, numpy scalars -> Python)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(matrix, path, label=None):
+    """Write a ForecastMatrix as a snapshot file; returns path
+
+    The file is written next to its destination and renamed into place, so
+    readers never see a partial snapshot.
+    """
+    arrays = {
+        'constrained': np.ascontiguousarray(matrix.constrained.T, dtype=np.float64),
+        'unconstrained': np.ascontiguousarray(matrix.unconstrained.T, dtype=np.float64),
+        'price': np.asarray(matrix.price, dtype=np.float64),
+        'unconstrained_price': np.asarray(matrix.unconstrained_price, dtype=np.float64),
+        **{f"codes:{name}": np.asarray(matrix.codes(name), dtype=np.int32) for name in matrix.dimensions},
+    }
+
+    header = {
+        'label': label,
+        'helpers': [str(helper) for helper in matrix.helpers],
+        'week_columns': [[str(week), isinstance(week, (int, np.integer))] for week in matrix.week_columns],
+        'dimensions': {name: [_json_value(value) for value in matrix.categories(name)]
+                       for name in matrix.dimensions},
+        'arrays': {},
+    }
+    # Offsets are relative to the start of the data section, which follows the header
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    partial = path + '.partial'
+    with open(partial, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(partial, path)
+    return path
+
+
+class Snapshot:
+    """Read-only memory-mapped view of a snapshot file
+
+    Opening reads only the header; the arrays are views into the mapped
+    file and are paged in on first access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) not in READABLE_MAGICS:
+                raise ValueError(f"{path} is not a forecast snapshot")
+            (header_length,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_length))
+
+        self.label = header['label']
+        self.helpers = np.array(header['helpers'], dtype=object)
+        self.week_columns = [int(week) if is_int else week for week, is_int in header['week_columns']]
+        self.weeks = np.array([int(week) for week in self.week_columns], dtype=np.int64)
+        self.categories = {name: np.array([np.nan if value is None else value for value in values], dtype=object)
+                           for name, values in header['dimensions'].items()}
+
+        data_start = _aligned(len(MAGIC) + 8 + header_length)
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        self.arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            start = data_start + spec['offset']
+            count = int(np.prod(shape))
+            self.arrays[name] = self._map[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    @property
+    def shape(self):
+        return len(self.helpers), len(self.weeks)
+
+    @property
+    def constrained(self):
+        """(helpers, weeks) view"""
+        return self.arrays['constrained'].T
+
+    @property
+    def unconstrained(self):
+        return self.arrays['unconstrained'].T
+
+    def week_positions(self, weeks):
+        """Positions of the given week codes (ValueError for unknown weeks)"""
+        lookup = {int(week): i for i, week in enumerate(self.weeks)}
+        missing = [week for week in weeks if int(week) not in lookup]
+        if missing:
+            raise ValueError(f"Weeks not in snapshot: {missing}")
+        return np.array([lookup[int(week)] for week in weeks], dtype=np.intp)
+
+    def to_matrix(self, weeks=None):
+        """ForecastMatrix (float64) of all weeks, or only the given week codes
+
+        Only the selected weeks are read from the file.
+        """
+        positions = np.arange(len(self.weeks)) if weeks is None else self.week_positions(weeks)
+        constrained = np.ascontiguousarray(self.arrays['constrained'][positions].T, dtype=np.float64)
+        unconstrained = np.ascontiguousarray(self.arrays['unconstrained'][positions].T, dtype=np.float64)
+        dimensions = {name: (np.array(self.arrays[f"codes:{name}"]), categories)
+                      for name, categories in self.categories.items()}
+        return ForecastMatrix(self.helpers, [self.week_columns[i] for i in positions],
+                              constrained, unconstrained,
+                              self.arrays['price'].astype(np.float64),
+                              self.arrays['unconstrained_price'].astype(np.float64), dimensions)
+
+    def close(self):
+        """Drop the array views and the memory map"""
+        self.arrays = {}
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_snapshot(path):
+    """Open a snapshot written by write_snapshot"""
+    return Snapshot(path)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - STAR SCHEMA EXPORT
+Normalized export of one FC version for BI tools:
+
+    fact_forecast   one row per helper/week: Helper ID, Week ID, constrained
+                    and unconstrained units side by side plus the derived
+                    revenue / delta / gap measures
+    dim_helper      Helper ID -> helper, customer, SKU, PDT and prices
+    dim_calendar    Week ID -> week code, year, week number, quarter
+
+The descriptive columns are stored once per helper or week instead of on
+every tall row, so the export is several times smaller than the Looker
+view. Tables are written as Parquet when pyarrow is installed, else CSV.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+def dim_helper(matrix):
+    """Helper dimension: one row per matrix row"""
+    return pd.DataFrame({
+        'Helper ID': np.arange(matrix.shape[0], dtype=np.int32),
+        'Helper': matrix.helpers,
+        'Customer': matrix.values('Customer'),
+        'Customer ID': matrix.values('Customer ID'),
+        'Anker SKU': matrix.values('Anker SKU'),
+        'PDT': matrix.values('PDT'),
+        'Sell-In Price': matrix.price,
+        'Unconstrained Price': matrix.unconstrained_price,
+    })
+
+
+def dim_calendar(matrix, quarters, current_quarter):
+    """Calendar dimension: one row per week column"""
+    quarters = np.asarray(quarters, dtype=object)
+    return pd.DataFrame({
+        'Week ID': np.arange(matrix.shape[1], dtype=np.int16),
+        'Week': matrix.weeks,
+        'Year': matrix.weeks // 100,
+        'Week Number': matrix.weeks % 100,
+        'Quarter': quarters,
+        'IsCurrentQ': quarters == current_quarter,
+    })
+
+
+def iter_fact(matrix, chunk_rows=100000, sparse=False):
+    """Yield the fact table in chunks of about chunk_rows rows, in helper/week order
+
+    With sparse=True cells where both forecasts are 0 are left out.
+    """
+    n_rows, n_weeks = matrix.shape
+    helpers_per_chunk = max(1, chunk_rows // max(n_weeks, 1))
+    for start in range(0, max(n_rows, 1), helpers_per_chunk):
+        stop = min(start + helpers_per_chunk, n_rows)
+        constrained = matrix.constrained[start:stop]
+        unconstrained = matrix.unconstrained[start:stop]
+        if sparse:
+            rows, weeks = np.nonzero((constrained != 0) | (unconstrained != 0))
+        else:
+            rows = np.repeat(np.arange(stop - start), n_weeks)
+            weeks = np.tile(np.arange(n_weeks), stop - start)
+        constrained = constrained[rows, weeks]
+        unconstrained = unconstrained[rows, weeks]
+        helper_ids = rows + start
+        constrained_revenue = constrained * matrix.price[helper_ids]
+        unconstrained_revenue = unconstrained * matrix.unconstrained_price[helper_ids]
+        yield pd.DataFrame({
+            'Helper ID': helper_ids.astype(np.int32),
+            'Week ID': weeks.astype(np.int16),
+            'Constrained Units': constrained,
+            'Unconstrained Units': unconstrained,
+            'Constrained Revenue': constrained_revenue,
+            'Unconstrained Revenue': unconstrained_revenue,
+            'Delta Units': constrained - unconstrained,
+            'Delta - Revenue': constrained_revenue - unconstrained_revenue,
+            'Supply Gap': constrained < unconstrained,
+        })
+
+
+def _write_table(chunks, path_base, file_format):
+    """Write DataFrame chunks to one Parquet or CSV file; returns the path"""
+    path = f"{path_base}.{file_format}"
+    writer = None
+    try:
+        for i, chunk in enumerate(chunks):
+            if file_format == 'parquet':
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def save_star_schema(matrix, quarters, current_quarter, output_dir='forecast_star',
+                     file_format=None, chunk_rows=100000, sparse=False):
+    """Write fact_forecast, dim_helper and dim_calendar to output_dir
+
+    file_format is 'parquet' or 'csv' (default: Parquet when pyarrow is
+    installed). Returns {table name: path}.
+    """
+    file_format = file_format or ('parquet' if PARQUET_AVAILABLE else 'csv')
+    if file_format == 'parquet' and not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet output. Install pyarrow")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tables = {
+        'fact_forecast': iter_fact(matrix, chunk_rows, sparse),
+        'dim_helper': [dim_helper(matrix)],
+        'dim_calendar': [dim_calendar(matrix, quarters, current_quarter)],
+    }
+    paths = {name: _write_table(chunks, os.path.join(output_dir, name), file_format)
+             for name, chunks in tables.items()}
+    size = sum(os.path.getsize(path) for path in paths.values())
+    print(f"✓ Saved star schema to {output_dir} ({size / 1e6:,.1f} MB {file_format})")
+    return paths
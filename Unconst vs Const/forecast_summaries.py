@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - SUMMARY AGGREGATION
+Builds the SKU / Customer / Weekly Trends / PDT summary tables in one pass
+over the supply gap cells. The gap cells are taken straight from the dense
+helper x week matrix (or, without a matrix, from the gap rows of the tall
+view), and every rollup and distinct count is computed on integer group
+codes, so zero and non-gap cells are never turned into rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _dimension(codes, categories):
+    """(codes with -1 for missing values, categories)"""
+    categories = np.asarray(categories, dtype=object)
+    missing = pd.isna(categories)
+    if missing.any():
+        codes = np.where(missing[codes], -1, codes)
+    return codes, categories
+
+
+def cell_deltas(matrix, rows, week_codes):
+    """(delta units, delta revenue) of the given helper/week cells of a ForecastMatrix"""
+    constrained = matrix.constrained[rows, week_codes]
+    unconstrained = matrix.unconstrained[rows, week_codes]
+    revenue = constrained * matrix.price[rows] - unconstrained * matrix.unconstrained_price[rows]
+    return constrained - unconstrained, revenue
+
+
+class GapCells:
+    """Delta units/revenue of every supply gap cell with its dimension codes"""
+
+    def __init__(self, units, revenue, week_codes, weeks, quarters, dimensions):
+        self.units = units                  # (cells,) delta units (< 0)
+        self.revenue = revenue              # (cells,) delta revenue
+        self.week_codes = week_codes        # (cells,) position in weeks
+        self.weeks = weeks                  # week values
+        self.quarters = quarters            # quarter label of each week
+        self.dimensions = dimensions        # name -> (codes, categories), code -1 = missing
+
+    @classmethod
+    def from_matrix(cls, matrix, quarters):
+        """Gap cells of a ForecastMatrix; quarters labels each week column"""
+        rows, week_codes = np.nonzero(matrix.gap_mask)
+        units, revenue = cell_deltas(matrix, rows, week_codes)
+        return cls.from_cells(matrix, quarters, rows, week_codes, units, revenue)
+
+    @classmethod
+    def from_cells(cls, matrix, quarters, rows, week_codes, units, revenue):
+        """Gap cells at the given matrix rows/week positions with their delta units and revenue"""
+        dimensions = {name: _dimension(matrix.codes(name)[rows], matrix.categories(name))
+                      for name in ('Customer', 'Anker SKU', 'PDT')}
+        return cls(units, revenue, week_codes, matrix.weeks, np.asarray(quarters, dtype=object), dimensions)
+
+    @classmethod
+    def from_tall(cls, gaps_df):
+        """Gap cells from the Supply Gap rows of a tall view"""
+        week_codes, weeks = pd.factorize(gaps_df['Week'])
+        quarters = np.empty(len(weeks), dtype=object)
+        quarters[week_codes] = gaps_df['Quarter'].to_numpy(dtype=object)
+        dimensions = {name: pd.factorize(gaps_df[name])
+                      for name in ('Customer', 'Anker SKU', 'PDT')}
+        dimensions = {name: (codes, np.asarray(categories, dtype=object))
+                      for name, (codes, categories) in dimensions.items()}
+        return cls(gaps_df['Delta Units'].to_numpy(dtype=np.float64),
+                   gaps_df['Delta - Revenue'].to_numpy(dtype=np.float64),
+                   week_codes, np.asarray(weeks), quarters, dimensions)
+
+    def __len__(self):
+        return len(self.units)
+
+    def _codes(self, name):
+        if name == 'Week':
+            return self.week_codes, self.weeks
+        return self.dimensions[name]
+
+    def rollup(self, keys, distinct=None):
+        """Summed gap units/revenue per group of the key dimensions
+
+        Returns a DataFrame in key order with the key columns, 'Delta Units',
+        'Delta - Revenue', 'Count' and, if distinct is given, 'Distinct'
+        (number of different values of that dimension). Cells with a
+        missing key are left out, as in DataFrame.groupby.
+        """
+        combined = np.zeros(len(self), dtype=np.int64)
+        valid = np.ones(len(self), dtype=bool)
+        sizes = []
+        for name in keys:
+            codes, categories = self._codes(name)
+            combined = combined * len(categories) + codes
+            valid &= codes >= 0
+            sizes.append(len(categories))
+
+        groups, inverse = np.unique(combined[valid], return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n_groups = len(groups)
+        result = {}
+        remainder = groups
+        for name, size in zip(reversed(keys), reversed(sizes)):
+            remainder, codes = np.divmod(remainder, size)
+            result[name] = self._codes(name)[1][codes]
+        result = {name: result[name] for name in keys}
+
+        # groupby on the integer group codes: pandas' compensated sums, so totals
+        # (and ties in the rankings) come out exactly as from the tall view
+        sums = pd.DataFrame({'Delta Units': self.units[valid], 'Delta - Revenue': self.revenue[valid]})
+        sums = sums.groupby(inverse).sum()
+        result['Delta Units'] = sums['Delta Units'].to_numpy()
+        result['Delta - Revenue'] = sums['Delta - Revenue'].to_numpy()
+        result['Count'] = np.bincount(inverse, minlength=n_groups)
+        if distinct is not None:
+            codes, categories = self._codes(distinct)
+            codes = codes[valid]
+            present = codes >= 0
+            pairs = np.unique(inverse[present].astype(np.int64) * len(categories) + codes[present])
+            result['Distinct'] = np.bincount(pairs // len(categories), minlength=n_groups)
+
+        frame = pd.DataFrame(result)
+        return frame.sort_values(list(keys), kind='stable').reset_index(drop=True)
+
+    def distinct(self, name):
+        """Number of different (non-missing) values of a dimension among the gap cells"""
+        codes = self._codes(name)[0]
+        return len(np.unique(codes[codes >= 0]))
+
+    def totals(self):
+        """Headline figures: gap records, revenue/units at risk, affected SKUs and
+        customers, and revenue impact per quarter"""
+        revenue = pd.Series(self.revenue)
+        return {
+            'gap_records': len(self),
+            'revenue_at_risk': float(revenue.abs().sum()),
+            'units_at_risk': float(pd.Series(self.units).abs().sum()),
+            'skus_affected': self.distinct('Anker SKU'),
+            'customers_affected': self.distinct('Customer'),
+            'quarter_revenue': revenue.groupby(self.quarters[self.week_codes]).sum().abs(),
+        }
+
+    def summaries(self):
+        """The four dashboard summaries, in the layout of ForecastAutomation.create_summaries"""
+        summaries = {}
+
+        sku_summary = self.rollup(['Anker SKU', 'PDT'], distinct='Customer')
+        sku_summary = pd.DataFrame({
+            'SKU': sku_summary['Anker SKU'],
+            'PDT': sku_summary['PDT'],
+            'Gap Units': sku_summary['Delta Units'].abs(),
+            'Revenue Impact': sku_summary['Delta - Revenue'].abs(),
+            'Customers Affected': sku_summary['Distinct'],
+        }).sort_values('Revenue Impact', ascending=False)
+        sku_summary.insert(0, 'Rank', range(1, len(sku_summary) + 1))
+        summaries['sku_summary'] = sku_summary
+
+        customer_summary = self.rollup(['Customer'], distinct='Anker SKU')
+        customer_summary = pd.DataFrame({
+            'Customer': customer_summary['Customer'],
+            'Gap Units': customer_summary['Delta Units'].abs(),
+            'Revenue Impact': customer_summary['Delta - Revenue'].abs(),
+            'SKUs Affected': customer_summary['Distinct'],
+        }).sort_values('Revenue Impact', ascending=False)
+        customer_summary.insert(0, 'Rank', range(1, len(customer_summary) + 1))
+        summaries['customer_summary'] = customer_summary
+
+        weekly_trends = self.rollup(['Week'])
+        weekly_trends = pd.DataFrame({
+            'Week': weekly_trends['Week'],
+            'Quarter': self.quarters[pd.Index(self.weeks).get_indexer(weekly_trends['Week'])],
+            'Gap Units': weekly_trends['Delta Units'].abs(),
+            'Revenue Impact': weekly_trends['Delta - Revenue'].abs(),
+            'Records Count': weekly_trends['Count'],
+        }).sort_values('Week')
+        summaries['weekly_trends'] = weekly_trends
+
+        pdt_summary = self.rollup(['PDT'], distinct='Customer')
+        pdt_summary = pd.DataFrame({
+            'PDT': pdt_summary['PDT'],
+            'Gap Units': pdt_summary['Delta Units'].abs(),
+            'Revenue Impact': pdt_summary['Delta - Revenue'].abs(),
+            'Customers Affected': pdt_summary['Distinct'],
+        }).sort_values('Revenue Impact', ascending=False)
+        summaries['pdt_summary'] = pdt_summary
+
+        return summaries
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - FC VERSION COMPARISON
+Loads N forecast versions (25WK29, 25WK33, 25WK35, ...) into one aligned
+helpers x weeks x versions tensor and derives version-over-version deltas
+of constrained/unconstrained units and of the supply gap in one pass.
+
+Usage:
+    python3 forecast_versions.py <WK29.xlsx> <WK33.xlsx> <WK35.xlsx> ...
+    (.fcsnap snapshots can stand in for any of the workbooks)
+"""
+
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fiscal_calendar import FiscalCalendar
+from forecast_automation import ForecastAutomation
+from forecast_snapshot import SNAPSHOT_EXTENSION, open_snapshot
+
+
+def version_label(path):
+    """FC version label from a workbook name ('…25WK35 FC Version.xlsx' -> '25WK35')"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = re.search(r'\d{2}WK\d{2}', name, re.IGNORECASE)
+    return match.group(0).upper() if match else name
+
+
+class VersionCube:
+    """Constrained/unconstrained forecasts of several FC versions on one helper x week grid"""
+
+    def __init__(self, labels, helpers, weeks, constrained, unconstrained,
+                 price, unconstrained_price, present, week_present, dimensions):
+        self.labels = list(labels)
+        self.helpers = helpers                      # (helpers,) object
+        self.weeks = weeks                          # (weeks,) int64 week codes
+        self.constrained = constrained              # (helpers, weeks, versions) units
+        self.unconstrained = unconstrained          # (helpers, weeks, versions) units
+        self.price = price                          # (helpers, versions)
+        self.unconstrained_price = unconstrained_price
+        self.present = present                      # (helpers, weeks, versions) cell exists in version
+        self.week_present = week_present            # (weeks, versions) week column exists in version
+        self.dimensions = dimensions                # name -> (helpers,) values
+
+    @classmethod
+    def from_matrices(cls, labels, matrices):
+        """Align ForecastMatrix objects on the union of their helpers and weeks
+
+        Cells a version does not cover hold 0 and are marked absent in present.
+        """
+        helpers = pd.Index(pd.unique(np.concatenate([matrix.helpers for matrix in matrices])))
+        weeks = np.unique(np.concatenate([matrix.weeks for matrix in matrices]))
+        shape = (len(helpers), len(weeks), len(matrices))
+
+        constrained = np.zeros(shape)
+        unconstrained = np.zeros(shape)
+        price = np.zeros(shape[::2])
+        unconstrained_price = np.zeros(shape[::2])
+        present = np.zeros(shape, dtype=bool)
+        week_present = np.zeros(shape[1:], dtype=bool)
+        dimensions = {name: np.full(len(helpers), np.nan, dtype=object)
+                      for name in ('Customer', 'Anker SKU', 'PDT')}
+
+        for k, matrix in enumerate(matrices):
+            index = matrix.index
+            constrained[:, :, k] = index.take(matrix.constrained, helpers, weeks)
+            unconstrained[:, :, k] = index.take(matrix.unconstrained, helpers, weeks)
+            price[:, k] = index.take_rows(matrix.price, helpers)
+            unconstrained_price[:, k] = index.take_rows(matrix.unconstrained_price, helpers)
+            helper_present = index.helper_codes(helpers) >= 0
+            week_present[:, k] = index.week_positions(weeks) >= 0
+            present[:, :, k] = helper_present[:, None] & week_present[None, :, k]
+            # Later versions win for dimension values
+            for name, values in dimensions.items():
+                values[helper_present] = index.take_rows(matrix.values(name), helpers[helper_present])
+
+        return cls(labels, helpers.to_numpy(dtype=object), weeks, constrained, unconstrained,
+                   price, unconstrained_price, present, week_present, dimensions)
+
+    @property
+    def gap_units(self):
+        return self.constrained - self.unconstrained
+
+    @property
+    def gap_revenue(self):
+        return (self.constrained * self.price[:, None, :]
+                - self.unconstrained * self.unconstrained_price[:, None, :])
+
+    def shared_weeks(self):
+        """(weeks, versions - 1) mask of the weeks both versions of each consecutive pair cover"""
+        return self.week_present[:, :-1] & self.week_present[:, 1:]
+
+    def version_summary(self):
+        """Supply gap totals per version and their change against the previous version
+
+        Totals cover each version's own weeks; the changes compare the two
+        versions over the weeks they share, so weeks rolling in or off the
+        horizon do not show up as gap changes.
+        """
+        gap_units = self.gap_units
+        gaps = gap_units < 0
+        week_gap_units = np.abs(np.where(gaps, gap_units, 0).sum(axis=0))          # (weeks, versions)
+        week_gap_revenue = np.abs(np.where(gaps, self.gap_revenue, 0).sum(axis=0))
+        shared = self.shared_weeks()
+
+        def change(totals):
+            return np.concatenate([[0.0], (np.diff(totals, axis=1) * shared).sum(axis=0)])
+
+        return pd.DataFrame({
+            'Version': self.labels,
+            'Helpers': self.present.any(axis=1).sum(axis=0),
+            'Weeks': self.week_present.sum(axis=0),
+            'Gap Cells': gaps.sum(axis=(0, 1)),
+            'Gap Units': week_gap_units.sum(axis=0),
+            'Revenue Impact': week_gap_revenue.sum(axis=0),
+            'Constrained Units': self.constrained.sum(axis=(0, 1)),
+            'Unconstrained Units': self.unconstrained.sum(axis=(0, 1)),
+            'Gap Units Change': change(week_gap_units),
+            'Revenue Impact Change': change(week_gap_revenue),
+        })
+
+    def version_deltas(self, calendar=None):
+        """Helper/week cells that changed between consecutive versions, one row per cell and pair
+
+        Only weeks both versions cover are compared. A helper missing from one
+        version of a pair counts as a zero forecast there.
+        """
+        calendar = calendar or FiscalCalendar()
+        quarters = calendar.quarters(self.weeks)
+        gap_units = self.gap_units
+        gap_revenue = self.gap_revenue
+
+        # Differences along the version axis, all pairs at once
+        d_constrained = np.diff(self.constrained, axis=2)
+        d_unconstrained = np.diff(self.unconstrained, axis=2)
+        d_gap_units = np.diff(gap_units, axis=2)
+        d_gap_revenue = np.diff(gap_revenue, axis=2)
+        changed = (d_constrained != 0) | (d_unconstrained != 0) | (d_gap_revenue != 0)
+        changed &= self.shared_weeks()[None, :, :]
+        pairs, rows, weeks = np.nonzero(changed.transpose(2, 0, 1))  # grouped by version pair
+
+        labels = np.array(self.labels, dtype=object)
+        return pd.DataFrame({
+            'Customer': self.dimensions['Customer'][rows],
+            'Anker SKU': self.dimensions['Anker SKU'][rows],
+            'PDT': self.dimensions['PDT'][rows],
+            'Helper': self.helpers[rows],
+            'Quarter': quarters[weeks],
+            'Week': self.weeks[weeks],
+            'From Version': labels[pairs],
+            'To Version': labels[pairs + 1],
+            'Constrained Change': d_constrained[rows, weeks, pairs],
+            'Unconstrained Change': d_unconstrained[rows, weeks, pairs],
+            'Gap Units From': gap_units[rows, weeks, pairs],
+            'Gap Units To': gap_units[rows, weeks, pairs + 1],
+            'Gap Units Change': d_gap_units[rows, weeks, pairs],
+            'Gap Revenue Change': d_gap_revenue[rows, weeks, pairs],
+        })
+
+    def save_to_excel(self, output_file='forecast_version_comparison.xlsx'):
+        """Save the version summary and cell-level deltas"""
+        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            self.version_summary().to_excel(writer, sheet_name='Version_Summary', index=False)
+            self.version_deltas().to_excel(writer, sheet_name='Version_Deltas', index=False)
+        print(f"✓ Saved version comparison to {output_file}")
+        return output_file
+
+
+def load_version_cube(excel_files, labels=None):
+    """Load and align several FC version workbooks or snapshots (oldest first)"""
+    labels = labels or [version_label(path) for path in excel_files]
+    matrices = []
+    for path in excel_files:
+        if path.endswith(SNAPSHOT_EXTENSION):
+            with open_snapshot(path) as snapshot:
+                matrices.append(snapshot.to_matrix())
+            continue
+        automation = ForecastAutomation(path)
+        if not automation.load_data():
+            raise ValueError(f"Could not load forecast version {path}")
+        matrices.append(automation.build_matrix())
+
+    cube = VersionCube.from_matrices(labels, matrices)
+    print(f"✓ Version cube: {len(cube.helpers)} helpers x {len(cube.weeks)} weeks x {len(labels)} versions")
+    return cube
+
+
+def main():
+    """Compare the FC versions given on the command line"""
+    excel_files = sys.argv[1:]
+    if len(excel_files) < 2:
+        print("Usage: python3 forecast_versions.py <older.xlsx> <newer.xlsx> [...]")
+        return
+
+    cube = load_version_cube(excel_files)
+    print(cube.version_summary().to_string(index=False))
+    cube.save_to_excel()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+ANKER FORECAST AUTOMATION - STREAMING XLSX WRITER
+Writes the Looker view and the summary tabs with xlsxwriter in
+constant_memory mode: rows go to disk in order as each chunk of the
+transform arrives, so memory stays flat however many records there are.
+Number formats (currency, integers) are set once per column and picked up
+by every cell of that column; the cell writer is also chosen once per
+column instead of being dispatched per value.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+CURRENCY = '$#,##0.00'
+INTEGER = '#,##0'
+
+# Column name -> number format, for the Looker view and the summary tabs
+COLUMN_FORMATS = {
+    'Forecast Revenue': CURRENCY,
+    'Delta - Revenue': CURRENCY,
+    'Sell-In Price': CURRENCY,
+    'Revenue Impact': CURRENCY,
+    'Forecast - Units': INTEGER,
+    'Delta Units': INTEGER,
+    'Gap Units': INTEGER,
+    'Records Count': INTEGER,
+    'Customers Affected': INTEGER,
+    'SKUs Affected': INTEGER,
+    'Rank': '0',
+    'Week': '0',
+}
+
+
+class StreamingWorkbook:
+    """xlsx workbook whose sheets are written row by row from DataFrame chunks
+
+    In constant_memory mode a sheet's rows must be written in order, and a
+    sheet should be complete before the next one is started.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.bold = self.workbook.add_format({'bold': True})
+        self.formats = {}
+
+    def _format(self, number_format):
+        if number_format not in self.formats:
+            self.formats[number_format] = self.workbook.add_format({'num_format': number_format})
+        return self.formats[number_format]
+
+    def _column_writers(self, worksheet, chunk):
+        """Cell writer and column format for each column, chosen once"""
+        writers = []
+        for j, (name, dtype) in enumerate(chunk.dtypes.items()):
+            number_format = COLUMN_FORMATS.get(name)
+            width = max(len(str(name)) + 2, 12)
+            worksheet.set_column(j, j, width, self._format(number_format) if number_format else None)
+            if pd.api.types.is_bool_dtype(dtype):
+                writers.append(worksheet.write_boolean)
+            elif pd.api.types.is_numeric_dtype(dtype):
+                writers.append(worksheet.write_number)
+            elif isinstance(dtype, pd.StringDtype):
+                writers.append(worksheet.write_string)
+            else:
+                writers.append(worksheet.write)
+        return writers
+
+    def write_frames(self, sheet_name, chunks):
+        """Write DataFrame chunks (one header, then every row) to a new sheet; returns rows written"""
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        writers = None
+        row = 1
+        for chunk in chunks:
+            if writers is None:
+                worksheet.write_row(0, 0, [str(name) for name in chunk.columns], self.bold)
+                writers = self._column_writers(worksheet, chunk)
+            columns = [_cell_values(chunk[name]) for name in chunk.columns]
+            for values in zip(*columns):
+                for j, value in enumerate(values):
+                    if value is not None:
+                        writers[j](row, j, value)
+                row += 1
+        return row - 1
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _cell_values(series):
+    """Python values of a column, with missing values as None (written as blank cells)"""
+    values = series.to_numpy(dtype=object) if series.dtype == object else series.to_numpy()
+    missing = pd.isna(values)
+    values = values.tolist()
+    if missing.any():
+        for i in np.flatnonzero(missing):
+            values[i] = None
+    return values
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_forecast_automation import make_wide_sheets  # noqa: E402
+from forecast_automation import ForecastAutomation  # noqa: E402
+
+
+def fractional(constrained_df, unconstrained_df, seed=3):
+    """Wide sheets with fractional units, like the allocation exports"""
+    rng = np.random.default_rng(seed)
+    for frame in (constrained_df, unconstrained_df):
+        weeks = [column for column in frame.columns if isinstance(column, (int, np.integer))]
+        frame[weeks] = frame[weeks] * rng.uniform(0.5, 1.5, (len(frame), len(weeks))).round(3)
+    return constrained_df, unconstrained_df
+
+
+@pytest.fixture
+def wide_sheets():
+    """Small synthetic Constrained/Unconstrained Wide sheets with fractional units"""
+    return fractional(*make_wide_sheets(n_helpers=150, n_weeks=12))
+
+
+@pytest.fixture
+def make_automation(tmp_path):
+    """ForecastAutomation over given wide sheets, without a workbook on disk"""
+    def make(constrained_df, unconstrained_df, sparse=False, name='synthetic.xlsx'):
+        automation = ForecastAutomation(str(tmp_path / name), sparse=sparse)
+        automation.data = {'constrained': constrained_df.copy(), 'unconstrained': unconstrained_df.copy()}
+        return automation
+    return make
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+
+def bumped(constrained):
+    """Copy of the constrained sheet with every forecast 10 units higher"""
+    constrained = constrained.copy()
+    weeks = [column for column in constrained.columns if isinstance(column, int)]
+    constrained[weeks] = constrained[weeks].fillna(0) + 10
+    return constrained
+
+
+def derive_everything(automation):
+    """Touch every memoized artifact and the tall view"""
+    return {
+        'tall': automation.output_data,
+        'summaries': automation.create_summaries(),
+        'gap_rows': automation.gap_rows(),
+        'stats': automation.summary_stats(),
+        'pivot': automation.quarter_pivot(),
+    }
+
+
+def test_rebuilding_the_matrix_drops_derived_artifacts(wide_sheets, make_automation):
+    constrained, unconstrained = wide_sheets
+    automation = make_automation(constrained, unconstrained)
+    automation.build_matrix()
+    before = derive_everything(automation)
+    version = automation.output_version
+    assert automation._derived
+
+    automation.data['constrained'] = bumped(constrained)
+    automation.build_matrix()
+    assert automation.output_version > version
+    assert automation._derived == {}
+
+    after = derive_everything(automation)
+    fresh = make_automation(bumped(constrained), unconstrained)
+    fresh.build_matrix()
+    expected = derive_everything(fresh)
+    pd.testing.assert_frame_equal(after['tall'], expected['tall'])
+    pd.testing.assert_frame_equal(after['gap_rows'], expected['gap_rows'])
+    pd.testing.assert_frame_equal(after['pivot'], expected['pivot'])
+    for name, summary in expected['summaries'].items():
+        pd.testing.assert_frame_equal(after['summaries'][name], summary)
+    pd.testing.assert_series_equal(after['stats'].pop('quarter_revenue'), expected['stats'].pop('quarter_revenue'))
+    assert after['stats'] == expected['stats']
+    assert not after['tall'].equals(before['tall'])
+
+
+def test_reloading_drops_the_matrix_and_derived_artifacts(tmp_path, wide_sheets, make_automation):
+    constrained, unconstrained = wide_sheets
+    files = {}
+    for name, frame in (('old', constrained), ('new', bumped(constrained)), ('unconstrained', unconstrained)):
+        files[name] = str(tmp_path / f"{name}.csv")
+        frame.to_csv(files[name], index=False)
+
+    automation = make_automation(constrained, unconstrained)
+    assert automation.load_csv(files['old'], files['unconstrained'])
+    automation.build_matrix()
+    before = derive_everything(automation)
+    version = automation.output_version
+
+    assert automation.load_csv(files['new'], files['unconstrained'])
+    assert automation.output_version > version
+    assert automation._derived == {}
+    assert automation.matrix is None and automation.output_data is None
+
+    automation.build_matrix()
+    after = derive_everything(automation)
+    constrained_rows = after['tall']['Forecast Type'] == 'Constrained'
+    assert np.allclose(after['tall']['Forecast - Units'][constrained_rows],
+                       before['tall']['Forecast - Units'][constrained_rows] + 10)
+    assert after['stats']['units_at_risk'] != before['stats']['units_at_risk']
+
+
+def test_replacing_the_tall_view_drops_derived_artifacts(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    automation.build_matrix()
+    derive_everything(automation)
+    version = automation.output_version
+
+    automation.output_data = automation.output_data.head(10)
+    assert automation.output_version == version + 1
+    assert automation._derived == {}
@@ -0,0 +1,29 @@
+import os
+
+import pandas as pd
+
+from benchmark_forecast_automation import make_wide_sheets
+from forecast_batch import run_batch
+
+
+def test_batch_index_reports_load_cause_and_results(tmp_path):
+    source = tmp_path / 'inputs'
+    source.mkdir()
+    constrained, unconstrained = make_wide_sheets(n_helpers=40, n_weeks=6)
+    with pd.ExcelWriter(source / '25WK35 FC Version.xlsx') as writer:
+        constrained.to_excel(writer, sheet_name='Constrained Wide', index=False)
+        unconstrained.to_excel(writer, sheet_name='Unconstrained Wide', index=False)
+    with pd.ExcelWriter(source / 'Wrong Tabs.xlsx') as writer:
+        constrained.to_excel(writer, sheet_name='Sheet1', index=False)
+
+    index = run_batch(str(source), str(tmp_path / 'outputs'), workers=1, cache_dir=None)
+    index = index.set_index(index['Input'].map(os.path.basename))
+
+    ok = index.loc['25WK35 FC Version.xlsx']
+    assert ok['Status'] == 'ok'
+    assert ok['Records'] == ok['Helpers'] * ok['Weeks'] * 2
+    assert os.path.exists(ok['Output'])
+
+    failed = index.loc['Wrong Tabs.xlsx']
+    assert failed['Status'] == 'failed'
+    assert 'Could not find constrained/unconstrained sheets' in failed['Error']
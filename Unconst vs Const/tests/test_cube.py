@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_cube import CUBE_DIMENSIONS
+
+
+@pytest.fixture
+def cube_and_gaps(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    automation.build_matrix()
+    return automation.gap_cube(), automation.gap_rows()
+
+
+def expected(gaps, by):
+    grouped = gaps.groupby(by, sort=True)
+    return pd.DataFrame({
+        'Gap Units': grouped['Delta Units'].sum().abs(),
+        'Revenue Impact': grouped['Delta - Revenue'].sum().abs(),
+        'Gap Records': grouped.size(),
+        'Customers Affected': grouped['Customer'].nunique(),
+        'SKUs Affected': grouped['Anker SKU'].nunique(),
+    }).reset_index()
+
+
+def check(result, gaps, by):
+    want = expected(gaps, by)
+    assert len(result) == len(want)
+    for column in want.columns:
+        if column in by:
+            assert list(result[column]) == list(want[column])
+        else:
+            np.testing.assert_allclose(result[column].to_numpy(dtype=float), want[column].to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize('by', [['PDT'], ['Customer'], ['Quarter'], ['PDT', 'Week'], ['Customer', 'Anker SKU']])
+def test_query_matches_groupby(cube_and_gaps, by):
+    cube, gaps = cube_and_gaps
+    check(cube.query(by=by), gaps, by)
+
+
+def test_query_with_where_matches_groupby(cube_and_gaps):
+    cube, gaps = cube_and_gaps
+    pdts = sorted(gaps['PDT'].unique())[:2]
+    quarter = gaps['Quarter'].iloc[0]
+    selected = gaps[gaps['PDT'].isin(pdts) & (gaps['Quarter'] == quarter)]
+    check(cube.query(by=['Customer'], where={'PDT': pdts, 'Quarter': quarter}), selected, ['Customer'])
+
+
+def test_grand_total(cube_and_gaps):
+    cube, gaps = cube_and_gaps
+    total = cube.query().iloc[0]
+    assert total['Gap Records'] == len(gaps)
+    assert total['Customers Affected'] == gaps['Customer'].nunique()
+    assert total['SKUs Affected'] == gaps['Anker SKU'].nunique()
+    assert total['Gap Units'] == pytest.approx(abs(gaps['Delta Units'].sum()))
+
+
+def test_default_query_sums_from_coarse_aggregate(cube_and_gaps):
+    cube, _ = cube_and_gaps
+    cube.query(by='PDT')
+    assert cube.last_source != CUBE_DIMENSIONS
+    assert cube.last_source == ('PDT', 'Quarter', 'Week')
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+
+from forecast_dataset import open_dataset, read_dataset, dataset_filter
+
+VIEW_COLUMNS = ['Customer', 'Anker SKU', 'PDT', 'Forecast Type', 'Quarter', 'Week', 'Forecast - Units',
+                'Forecast Revenue', 'Delta Units', 'Delta - Revenue', 'Gap Flag', 'IsCurrentQ', 'Helper',
+                'Sell-In Price']
+
+
+def sheet_order(tall):
+    """The view in a fixed record order, with plain column dtypes"""
+    tall = tall[VIEW_COLUMNS].astype({'Quarter': str, 'Forecast Type': str, 'Week': 'int64'})
+    return tall.sort_values(['Helper', 'Week', 'Forecast Type'], ignore_index=True)
+
+
+def saved(wide_sheets, make_automation, root, version=None, weeks=None):
+    constrained, unconstrained = wide_sheets
+    if weeks is not None:
+        identity = [column for column in constrained.columns if not isinstance(column, int)]
+        constrained = constrained[identity + weeks]
+    automation = make_automation(constrained, unconstrained)
+    tall = automation.transform_to_tall()
+    automation.save_to_dataset(root, version=version, chunk_size=500)
+    return tall
+
+
+def test_round_trip(tmp_path, wide_sheets, make_automation):
+    root = str(tmp_path / 'dataset')
+    tall = saved(wide_sheets, make_automation, root)
+
+    pd.testing.assert_frame_equal(sheet_order(read_dataset(root)), sheet_order(tall), check_dtype=False)
+
+
+def test_partition_pruning(tmp_path, wide_sheets, make_automation):
+    root = str(tmp_path / 'dataset')
+    tall = saved(wide_sheets, make_automation, root, version='25WK35')
+    quarter = tall['Quarter'].iloc[0]
+
+    dataset = open_dataset(root)
+    selection = dataset_filter(versions='25WK35', quarters=quarter, forecast_types='Constrained')
+    fragments = list(dataset.get_fragments(filter=selection))
+    assert len(fragments) == tall.loc[tall['Quarter'] == quarter, 'Week'].nunique()
+    assert all(f"Quarter={quarter.replace(' ', '%20')}" in fragment.path
+               and 'Forecast Type=Constrained' in fragment.path.replace('%20', ' ') for fragment in fragments)
+
+    sliced = read_dataset(root, quarters=quarter, forecast_types='Constrained')
+    expected = tall[(tall['Quarter'] == quarter) & (tall['Forecast Type'] == 'Constrained')]
+    pd.testing.assert_frame_equal(sheet_order(sliced), sheet_order(expected), check_dtype=False)
+
+
+def test_overwrite_drops_stale_weeks(tmp_path, wide_sheets, make_automation):
+    root = str(tmp_path / 'dataset')
+    weeks = [column for column in wide_sheets[0].columns if isinstance(column, int)]
+    saved(wide_sheets, make_automation, root)
+
+    # The next run has fewer weeks: the dropped weeks must not linger
+    tall = saved(wide_sheets, make_automation, root, weeks=weeks[:6])
+    back = read_dataset(root)
+    assert sorted(back['Week'].astype(int).unique()) == weeks[:6]
+    assert len(back) == len(tall)
+
+
+def test_overwrite_one_version_keeps_the_others(tmp_path, wide_sheets, make_automation):
+    root = str(tmp_path / 'dataset')
+    weeks = [column for column in wide_sheets[0].columns if isinstance(column, int)]
+    old = saved(wide_sheets, make_automation, root, version='25WK34')
+    saved(wide_sheets, make_automation, root, version='25WK35')
+    new = saved(wide_sheets, make_automation, root, version='25WK35', weeks=weeks[:6])
+
+    assert len(read_dataset(root, versions='25WK34')) == len(old)
+    assert sorted(read_dataset(root, versions='25WK35')['Week'].astype(int).unique()) == weeks[:6]
+    assert len(read_dataset(root, versions='25WK35')) == len(new)
+    assert sorted(os.listdir(root)) == ['Version=25WK34', 'Version=25WK35']
@@ -0,0 +1,47 @@
+from datetime import date, datetime
+
+import pytest
+
+from fiscal_calendar import FiscalCalendar, weeks_in_year
+
+
+@pytest.mark.parametrize('week, quarter', [
+    (202513, 'Q1 2025'), (202514, 'Q2 2025'),
+    (202526, 'Q2 2025'), (202527, 'Q3 2025'),
+    (202539, 'Q3 2025'), (202540, 'Q4 2025'),
+    (202552, 'Q4 2025'), (202553, 'Q1 2026'), (202601, 'Q1 2026'),
+    (202854, 'Q1 2029'),
+])
+def test_quarter_boundaries(week, quarter):
+    assert FiscalCalendar().quarter(week) == quarter
+
+
+@pytest.mark.parametrize('week', [202600, 202654, 202555, 202699])
+def test_unknown_codes(week):
+    assert FiscalCalendar().quarter(week) == 'Unknown'
+
+
+def test_weeks_in_year():
+    assert weeks_in_year(2025) == 53
+    assert weeks_in_year(2026) == 53
+    assert weeks_in_year(2028) == 54   # leap year starting on a Saturday
+
+
+@pytest.mark.parametrize('day, week, quarter', [
+    (date(2025, 1, 1), 202501, 'Q1 2025'),
+    (date(2025, 3, 29), 202513, 'Q1 2025'),    # Saturday
+    (date(2025, 3, 30), 202514, 'Q2 2025'),    # Sunday starts the next week
+    (date(2025, 12, 27), 202552, 'Q4 2025'),
+    (date(2025, 12, 29), 202553, 'Q1 2026'),   # ISO calls this 2026-W01
+    (date(2026, 1, 2), 202601, 'Q1 2026'),
+    (datetime(2028, 12, 31, 9), 202854, 'Q1 2029'),
+])
+def test_current_quarter_uses_sheet_week_codes(day, week, quarter):
+    calendar = FiscalCalendar()
+    assert calendar.week_code(day) == week
+    assert calendar.current_quarter(day) == quarter
+
+
+def test_calendar_grows_past_its_years():
+    calendar = FiscalCalendar(2025, 2025)
+    assert list(calendar.quarters([202452, 203101, 203153])) == ['Q4 2024', 'Q1 2031', 'Q1 2032']
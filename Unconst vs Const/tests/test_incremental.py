@@ -0,0 +1,116 @@
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from forecast_matrix import ForecastMatrix
+
+
+@pytest.fixture
+def tall_calls(monkeypatch):
+    """Helper rows of every ForecastMatrix.to_tall call"""
+    calls = []
+    to_tall = ForecastMatrix.to_tall
+
+    def counting_to_tall(self, *args, **kwargs):
+        calls.append(self.shape[0])
+        return to_tall(self, *args, **kwargs)
+
+    monkeypatch.setattr(ForecastMatrix, 'to_tall', counting_to_tall)
+    return calls
+
+
+def edited(constrained, rows, amount=12.5):
+    """Copy of the constrained sheet with one week changed for the given rows"""
+    constrained = constrained.copy()
+    week = constrained.columns[-3]
+    constrained.loc[rows, week] = constrained.loc[rows, week] + amount
+    return constrained
+
+
+def check_matches_full(automation, make_automation, constrained, unconstrained, sparse=False):
+    full = make_automation(constrained, unconstrained, sparse=sparse)
+    expected = full.transform_to_tall()
+    assert_frame_equal(automation.output_data, expected)
+    assert (automation.output_data.dtypes == expected.dtypes).all()
+    assert_frame_equal(automation.gap_rows(), full.gap_rows())
+    for name, summary in full.create_summaries().items():
+        assert_frame_equal(automation.create_summaries()[name], summary)
+
+
+def test_rerun_recomputes_only_changed_helpers(tmp_path, wide_sheets, make_automation, tall_calls):
+    constrained, unconstrained = wide_sheets
+    state_file = str(tmp_path / 'state.pkl')
+
+    automation = make_automation(constrained, unconstrained)
+    automation.transform_incremental(state_file)
+    n_rows = automation.matrix.shape[0]
+    assert len(automation.changed_rows) == n_rows
+    assert tall_calls == [n_rows]
+
+    # Next week: three helpers change; only their blocks are rebuilt
+    constrained = edited(constrained, [4, 40, 77])
+    del tall_calls[:]
+    automation = make_automation(constrained, unconstrained)
+    automation.transform_incremental(state_file)
+
+    changed = automation.matrix.helpers[automation.changed_rows]
+    assert sorted(changed) == sorted(constrained.loc[[4, 40, 77], 'Important Helper'])
+    assert tall_calls == [3]
+    check_matches_full(automation, make_automation, constrained, unconstrained)
+
+
+def test_unchanged_rerun_recomputes_nothing(tmp_path, wide_sheets, make_automation, tall_calls):
+    state_file = str(tmp_path / 'state.pkl')
+    make_automation(*wide_sheets).transform_incremental(state_file)
+    tall_file = os.path.splitext(state_file)[0] + '.arrow'
+    written = os.path.getmtime(tall_file)
+
+    del tall_calls[:]
+    automation = make_automation(*wide_sheets)
+    automation.transform_incremental(state_file)
+
+    assert len(automation.changed_rows) == 0
+    assert tall_calls == []
+    assert os.path.getmtime(tall_file) == written
+    check_matches_full(automation, make_automation, *wide_sheets)
+
+
+def test_added_and_removed_helpers(tmp_path, wide_sheets, make_automation):
+    constrained, unconstrained = wide_sheets
+    state_file = str(tmp_path / 'state.pkl')
+    make_automation(constrained.iloc[10:], unconstrained).transform_incremental(state_file)
+
+    # Ten helpers come back at the top, ten drop off the end, one changes
+    constrained = edited(constrained.iloc[:-10], [60])
+    automation = make_automation(constrained, unconstrained)
+    automation.transform_incremental(state_file)
+
+    assert len(automation.changed_rows) < 15
+    check_matches_full(automation, make_automation, constrained, unconstrained)
+
+
+def test_sparse_rerun(tmp_path, wide_sheets, make_automation):
+    constrained, unconstrained = wide_sheets
+    state_file = str(tmp_path / 'state.pkl')
+    make_automation(constrained, unconstrained, sparse=True).transform_incremental(state_file)
+
+    constrained = edited(constrained, [5, 90])
+    automation = make_automation(constrained, unconstrained, sparse=True)
+    automation.transform_incremental(state_file)
+
+    assert automation.sparse
+    assert len(automation.changed_rows) == 2
+    check_matches_full(automation, make_automation, constrained, unconstrained, sparse=True)
+
+
+def test_state_layout(tmp_path, wide_sheets, make_automation):
+    state_file = str(tmp_path / 'state.pkl')
+    automation = make_automation(*wide_sheets)
+    automation.transform_incremental(state_file)
+
+    state = pd.read_pickle(state_file)
+    assert 'tall' not in state
+    assert len(state['hashes']) == len(state['records']) == automation.matrix.shape[0]
+    assert len(state['gap_rows']) == len(automation.gap_cells())
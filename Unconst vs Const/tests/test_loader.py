@@ -0,0 +1,136 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+import forecast_loader
+
+from forecast_loader import SheetCache, clean_numeric, read_wide_csv
+from forecast_schema import CANONICAL_COLUMNS
+
+
+def test_cache_round_trip(tmp_path):
+    cache = SheetCache(str(tmp_path))
+    frames = {'Constrained Wide': pd.DataFrame({'Important Helper': ['a', 'b'], 202535: [1.5, 2.0]})}
+    cache.put('key', frames)
+
+    cached = cache.get('key')
+    pd.testing.assert_frame_equal(cached['Constrained Wide'], frames['Constrained Wide'])
+
+
+def test_concurrent_puts_never_fail(tmp_path):
+    cache = SheetCache(str(tmp_path), max_bytes=1)   # every put evicts the other entries
+    frames = {'Constrained Wide': pd.DataFrame({'Important Helper': ['a'] * 50, 202535: range(50)})}
+    errors = []
+
+    def load(worker):
+        try:
+            for i in range(15):
+                cache.put(f"{worker}-{i}", frames)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_concurrent_puts_of_one_key(tmp_path, capsys):
+    cache = SheetCache(str(tmp_path))
+    frames = {'Constrained Wide': pd.DataFrame({'Important Helper': ['a'] * 50, 202535: range(50)})}
+    errors = []
+
+    def load():
+        try:
+            for _ in range(30):
+                cache.put('same', frames)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert 'Could not cache' not in capsys.readouterr().out
+    assert os.listdir(str(tmp_path)) == ['same']
+    pd.testing.assert_frame_equal(cache.get('same')['Constrained Wide'], frames['Constrained Wide'])
+
+
+def test_entry_removed_during_eviction(tmp_path, monkeypatch):
+    cache = SheetCache(str(tmp_path))
+    frames = {'Constrained Wide': pd.DataFrame({'Important Helper': ['a'], 202535: [1.0]})}
+    cache.put('old', frames)
+    cache.max_bytes = 1
+
+    # Another loader evicts 'old' between the directory scan and the size check
+    listdir = os.listdir
+
+    def racing_listdir(path):
+        if path.endswith('old'):
+            shutil.rmtree(path)
+        return listdir(path)
+
+    monkeypatch.setattr(forecast_loader.os, 'listdir', racing_listdir)
+    cache.put('new', frames)
+    assert not os.path.exists(os.path.join(str(tmp_path), 'old'))
+
+
+def test_clean_numeric_strips_currency_and_maps_errors():
+    values = ['$5,460.00', '-$1,224.67', '(76.00)', '"1,473"', ' 12 ', '#N/A', '#div/0!', '', None, 'abc']
+    numbers, counts = clean_numeric(values)
+
+    expected = [5460.0, -1224.67, -76.0, 1473.0, 12.0, 0.0, 0.0, np.nan, np.nan, np.nan]
+    np.testing.assert_array_equal(numbers.to_numpy(), expected)
+    assert numbers.dtype == np.float64
+    assert counts == {'cells': 10, 'currency': 2, 'errors': 2, 'blank': 2, 'invalid': 1}
+
+
+def test_clean_numeric_errors_as_nan():
+    numbers, counts = clean_numeric(['#N/A', '#DIV/0!', '#REF!', '7'], error_value=np.nan)
+
+    np.testing.assert_array_equal(numbers.to_numpy(), [np.nan, np.nan, np.nan, 7.0])
+    assert counts['errors'] == 3 and counts['invalid'] == 0
+
+
+def write_export(path):
+    rows = [
+        'Constrained Forecast export,,,,,,,,,',
+        'Important Helper,Sell-in Price,PCT,PDT,Customer ID,Customer,Anker SKU,SKU Description,202535,202536',
+        '1473B2698H21,"$26.69",Power,Charger,1473,COSTCO,B2698H21,Charger 65W,"1,200.00",#N/A',
+        '532A1340011,"$103.31",Power,Battery,532,BBY,A1340011,Power Bank,(25.00),#DIV/0!',
+        ',,,,,,,,,',
+        '532A1695H11,#N/A,Power,Essential,532,BBY,A1695H11,Cable,n/a?,',
+    ]
+    with open(path, 'w', encoding='utf-8-sig') as f:
+        f.write('\n'.join(rows) + '\n')
+
+
+def test_read_wide_csv_cleans_price_and_weeks(tmp_path):
+    path = str(tmp_path / 'constrained.csv')
+    write_export(path)
+    frame, quality = read_wide_csv(path)
+
+    assert list(frame.columns[:8]) == CANONICAL_COLUMNS
+    assert frame['Important Helper'].tolist() == ['1473B2698H21', '532A1340011', '532A1695H11']
+    np.testing.assert_array_equal(frame['Sell-in Price'].to_numpy(), [26.69, 103.31, 0.0])
+    np.testing.assert_array_equal(frame['202535'].to_numpy(), [1200.0, -25.0, np.nan])
+    np.testing.assert_array_equal(frame['202536'].to_numpy(), [0.0, 0.0, np.nan])
+    assert quality == {'cells': 9, 'currency': 2, 'errors': 3, 'blank': 1, 'invalid': 1}
+
+
+def test_load_csv_keeps_quality_counts(tmp_path, make_automation, wide_sheets):
+    constrained = str(tmp_path / 'constrained.csv')
+    write_export(constrained)
+    automation = make_automation(*wide_sheets)
+
+    assert automation.load_csv(constrained, constrained, error_value=np.nan)
+    assert np.isnan(automation.data['constrained']['202536']).all()
+    assert automation.data_quality['constrained']['errors'] == 3
+    assert automation.data_quality['unconstrained']['invalid'] == 1
@@ -0,0 +1,48 @@
+from pandas.testing import assert_frame_equal
+
+from forecast_parallel import customer_shards, parallel_tall
+
+
+def test_parallel_matches_serial(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    matrix = automation.build_matrix()
+    quarters, current_quarter = automation.week_quarters(), automation.current_quarter()
+
+    for sparse in (False, True):
+        pooled = parallel_tall(matrix, quarters, current_quarter, workers=2, sparse=sparse, min_cells=0)
+        assert_frame_equal(pooled, matrix.to_tall(quarters, current_quarter, sparse=sparse))
+
+
+def test_parallel_sparse_with_all_zero_shards(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    matrix = automation.build_matrix()
+    quarters, current_quarter = automation.week_quarters(), automation.current_quarter()
+
+    # One customer without any forecast, then nothing at all
+    empty = matrix.codes('Customer ID') == 0
+    matrix.constrained[empty] = matrix.unconstrained[empty] = 0
+    pooled = parallel_tall(matrix, quarters, current_quarter, workers=2, sparse=True, min_cells=0)
+    assert_frame_equal(pooled, matrix.to_tall(quarters, current_quarter, sparse=True))
+
+    matrix.constrained[:] = matrix.unconstrained[:] = 0
+    pooled = parallel_tall(matrix, quarters, current_quarter, workers=2, sparse=True, min_cells=0)
+    assert_frame_equal(pooled, matrix.to_tall(quarters, current_quarter, sparse=True))
+
+
+def test_small_matrix_stays_serial(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    matrix = automation.build_matrix()
+    quarters, current_quarter = automation.week_quarters(), automation.current_quarter()
+
+    tall = parallel_tall(matrix, quarters, current_quarter, workers=2, min_cells=matrix.constrained.size + 1)
+    assert_frame_equal(tall, matrix.to_tall(quarters, current_quarter))
+
+
+def test_customer_shards_cover_every_row_once(wide_sheets, make_automation):
+    matrix = make_automation(*wide_sheets).build_matrix()
+    shards = customer_shards(matrix, 4)
+
+    rows = sorted(row for shard in shards for row in shard)
+    assert rows == list(range(matrix.shape[0]))
+    customers = matrix.codes('Customer ID')
+    assert all(not set(customers[a]) & set(customers[b]) for i, a in enumerate(shards) for b in shards[i + 1:])
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_pivot import COMMENT_COLUMNS, PIVOT_MEASURES, read_comments, save_pivot
+
+UNITS, REVENUE = PIVOT_MEASURES
+
+
+@pytest.fixture
+def automation(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    automation.build_matrix()
+    return automation
+
+
+def test_totals_match_gap_summaries(automation):
+    pivot = automation.quarter_pivot()
+    stats = automation.summary_stats()
+
+    assert pivot[('Grand Total', UNITS)].sum() == pytest.approx(-stats['units_at_risk'])
+    assert pivot[('Grand Total', REVENUE)].sum() == pytest.approx(-stats['revenue_at_risk'])
+    for quarter, revenue in stats['quarter_revenue'].items():
+        assert pivot[(quarter, REVENUE)].sum() == pytest.approx(-revenue)
+
+    by_customer = pivot.groupby(level='Customer')[[('Grand Total', UNITS), ('Grand Total', REVENUE)]].sum()
+    summary = automation.create_summaries()['customer_summary'].set_index('Customer')
+    np.testing.assert_allclose(-by_customer.iloc[:, 0], summary.loc[by_customer.index, 'Gap Units'])
+    np.testing.assert_allclose(-by_customer.iloc[:, 1], summary.loc[by_customer.index, 'Revenue Impact'])
+
+
+def test_rows_are_ordered_by_customer_gap(automation):
+    pivot = automation.quarter_pivot()
+    summary = automation.create_summaries()['customer_summary'].sort_values('Rank')
+
+    customers = pivot.index.get_level_values('Customer')
+    assert list(pd.unique(customers)) == summary['Customer'].tolist()
+    for customer in pd.unique(customers):
+        revenue = pivot.loc[customers == customer, ('Grand Total', REVENUE)].to_numpy()
+        assert (np.diff(revenue) >= 0).all()   # largest gap (most negative) first
+
+
+def test_comments_are_joined_by_helper(automation):
+    helpers = automation.quarter_pivot().index.get_level_values('Helper')
+    comments = pd.DataFrame({
+        'Helper': [helpers[3], helpers[0], 'no such helper'],
+        'Battery supply shortage': ['Shortage High risk', 'Good', 'Good'],
+        "DP's comment": ['Expedite', None, 'Ignored'],
+    })
+    pivot = automation.quarter_pivot(comments)
+
+    shortage, comment = (pivot[(column, '')] for column in COMMENT_COLUMNS)
+    assert shortage.iloc[3] == 'Shortage High risk' and comment.iloc[3] == 'Expedite'
+    assert shortage.iloc[0] == 'Good' and pd.isna(comment.iloc[0])
+    assert shortage.drop(shortage.index[[0, 3]]).isna().all()
+    assert comment.drop(comment.index[[0, 3]]).isna().all()
+
+
+def test_comments_read_back_from_a_pivot_export(tmp_path, automation):
+    helpers = automation.quarter_pivot().index.get_level_values('Helper')
+    comments = pd.DataFrame({'Helper': [helpers[1]], "DP's comment": ['Holding constrained']})
+    path = str(tmp_path / 'pivot.csv')
+    save_pivot(automation.quarter_pivot(comments), path)
+
+    assert read_comments(path).loc[helpers[1], "DP's comment"] == 'Holding constrained'
+    assert automation.quarter_pivot(path)[("DP's comment", '')].iloc[1] == 'Holding constrained'
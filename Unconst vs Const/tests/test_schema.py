@@ -0,0 +1,62 @@
+import pytest
+
+from forecast_schema import sniff_schema
+
+
+def test_renamed_headers_resolve_by_alias():
+    header = ['Helper', 'Sell in price', 'pct', 'PDT', 'ID', 'Customer Name', 'SKU', 'Description', 202535]
+    schema = sniff_schema([header])
+
+    assert schema.identity == {'Important Helper': 0, 'Sell-in Price': 1, 'PCT': 2, 'PDT': 3,
+                               'Customer ID': 4, 'Customer': 5, 'Anker SKU': 6, 'SKU Description': 7}
+    assert schema.weeks == [(8, 202535)]
+
+
+def test_reordered_headers_and_header_row():
+    header = [202536, 'Anker SKU', 'Customer', 'Sell-in Price', 'Important Helper', 202535]
+    schema = sniff_schema([['Forecast export'], [], header])
+
+    assert schema.header_row == 2
+    assert schema.identity['Important Helper'] == 4
+    assert schema.identity['Sell-in Price'] == 3
+    assert schema.identity['Customer'] == 2
+    assert schema.identity['Anker SKU'] == 1
+    assert schema.weeks == [(0, 202536), (5, 202535)]
+
+
+def test_extra_columns_are_ignored():
+    header = ['Important Helper', 'Region', 'Sell-in Price', 'Notes', 'PDT', 'Customer ID', 'Customer',
+              'Anker SKU', 'Owner', 202535, 'Total']
+    schema = sniff_schema([header])
+
+    assert [schema.identity[name] for name in ('Important Helper', 'Sell-in Price', 'PDT', 'Customer ID',
+                                               'Customer', 'Anker SKU')] == [0, 2, 4, 5, 6, 7]
+    assert schema.positions == [0, 2, 4, 5, 6, 7, 9]
+
+
+def test_legacy_positions_fill_unnamed_columns():
+    header = ['Important Helper', 'Sell-in Price', 'Category', 'Product', 'Acct', 'Customer', 'Anker SKU',
+              'Text', 202535]
+    schema = sniff_schema([header])
+
+    assert schema.identity['PCT'] == 2
+    assert schema.identity['PDT'] == 3
+    assert schema.identity['Customer ID'] == 4
+    assert schema.identity['SKU Description'] == 7
+
+
+def test_legacy_positions_skip_claimed_and_week_columns():
+    header = ['Helper', 'Sell-in Price', 'Customer', 'SKU', 202535, 202536]
+    schema = sniff_schema([header])
+
+    assert schema.identity['PCT'] is None          # position 2 is Customer
+    assert schema.identity['PDT'] is None          # position 3 is SKU
+    assert schema.identity['Customer ID'] is None  # position 4 is a week
+    assert schema.identity['SKU Description'] is None
+
+
+def test_missing_price_or_helper_raises():
+    with pytest.raises(ValueError, match='Sell-in Price'):
+        sniff_schema([['Helper', 'Price', 'Customer', 'SKU', 202535]])
+    with pytest.raises(ValueError, match='Important Helper'):
+        sniff_schema([['Customer', 'Sell-in Price', 'SKU', 202535, 202536]])  # position 0 is taken
@@ -0,0 +1,75 @@
+import functools
+import types
+
+import pytest
+
+import forecast_automation
+from forecast_automation import LOOKER_SHEET
+from forecast_sheets import BulkUploader, HttpSpreadsheet, sheet_values
+from forecast_sheets_standin import SheetsStandIn
+
+
+@pytest.fixture
+def standin(monkeypatch, tmp_path):
+    """upload_to_google_sheets wired to a local SheetsStandIn instead of gspread"""
+    with SheetsStandIn() as server:
+        client = types.SimpleNamespace(open_by_key=lambda key: HttpSpreadsheet(key, base_url=server.url))
+        monkeypatch.setattr(forecast_automation, 'GOOGLE_SHEETS_AVAILABLE', True)
+        monkeypatch.setattr(forecast_automation, 'gspread',
+                            types.SimpleNamespace(authorize=lambda creds: client), raising=False)
+        monkeypatch.setattr(forecast_automation, 'Credentials', types.SimpleNamespace(
+            from_service_account_file=lambda path, scopes: None), raising=False)
+        # Small chunks and fast retries, so an outage fails the upload midway quickly
+        monkeypatch.setattr(forecast_automation, 'BulkUploader',
+                            functools.partial(BulkUploader, max_cells=3000, max_retries=1, backoff=0.01))
+        yield server
+
+
+def upload(automation, tmp_path):
+    credentials = tmp_path / 'credentials.json'
+    credentials.write_text('{}')
+    return automation.upload_to_google_sheets('test', str(credentials), rate=1000, sync=False,
+                                              manifest_file=str(tmp_path / 'manifest.json'),
+                                              progress_file=str(tmp_path / 'progress.json'))
+
+
+def expected_rows(automation):
+    view = automation.output_data
+    return [list(view.columns)] + sheet_values(view)
+
+
+def test_resume_after_interrupted_upload(standin, tmp_path, wide_sheets, make_automation, capsys):
+    automation = make_automation(*wide_sheets)
+    automation.build_matrix()
+
+    standin.fail_after = 8
+    assert not upload(automation, tmp_path)
+    standin.fail_after = None
+    capsys.readouterr()
+    assert upload(automation, tmp_path)
+
+    assert f"Resuming upload to {LOOKER_SHEET}" in capsys.readouterr().out
+    assert standin.sheets[LOOKER_SHEET] == expected_rows(automation)
+
+
+def test_resume_after_data_change_rewrites(standin, tmp_path, wide_sheets, make_automation, capsys):
+    constrained, unconstrained = wide_sheets
+    automation = make_automation(constrained, unconstrained)
+    automation.build_matrix()
+    standin.fail_after = 8
+    assert not upload(automation, tmp_path)
+    standin.fail_after = None
+
+    # Same workbook name and shape, different numbers
+    constrained = constrained.copy()
+    week = constrained.columns[-1]
+    constrained[week] = constrained[week] + 3.5
+    changed = make_automation(constrained, unconstrained)
+    changed.build_matrix()
+    assert changed.record_count() == automation.record_count()
+    assert changed.output_digest() != automation.output_digest()
+
+    capsys.readouterr()
+    assert upload(changed, tmp_path)
+    assert "Resuming" not in capsys.readouterr().out
+    assert standin.sheets[LOOKER_SHEET] == expected_rows(changed)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from forecast_snapshot import open_snapshot, write_snapshot
+from forecast_versions import VersionCube
+
+
+def test_snapshot_round_trips_fractional_units(tmp_path, wide_sheets, make_automation):
+    matrix = make_automation(*wide_sheets).build_matrix()
+    assert (matrix.constrained % 1 != 0).any()
+
+    path = write_snapshot(matrix, str(tmp_path / 'version.fcsnap'))
+    with open_snapshot(path) as snapshot:
+        restored = snapshot.to_matrix()
+
+    np.testing.assert_array_equal(restored.constrained, matrix.constrained)
+    np.testing.assert_array_equal(restored.unconstrained, matrix.unconstrained)
+    np.testing.assert_array_equal(restored.price, matrix.price)
+    np.testing.assert_array_equal(restored.unconstrained_price, matrix.unconstrained_price)
+
+
+def test_version_against_its_own_snapshot_has_no_deltas(tmp_path, wide_sheets, make_automation):
+    matrix = make_automation(*wide_sheets).build_matrix()
+    path = write_snapshot(matrix, str(tmp_path / 'version.fcsnap'))
+    with open_snapshot(path) as snapshot:
+        restored = snapshot.to_matrix()
+
+    cube = VersionCube.from_matrices(['workbook', 'snapshot'], [matrix, restored])
+    assert cube.version_deltas().empty
+    assert (cube.version_summary()[['Gap Units Change', 'Revenue Impact Change']] == 0).all().all()
+
+
+def test_reads_partial_week_selection(tmp_path, wide_sheets, make_automation):
+    matrix = make_automation(*wide_sheets).build_matrix()
+    path = write_snapshot(matrix, str(tmp_path / 'version.fcsnap'))
+    with open_snapshot(path) as snapshot:
+        restored = snapshot.to_matrix(matrix.weeks[[2, 5]])
+
+    np.testing.assert_array_equal(restored.constrained, matrix.constrained[:, [2, 5]])
+    assert list(restored.weeks) == list(matrix.weeks[[2, 5]])
@@ -0,0 +1,24 @@
+def test_record_count_after_switching_sparse_on(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets)
+    automation.build_matrix()
+    automation.sparse = True
+
+    assert automation.record_count() == len(automation.output_data)
+    assert automation.record_count() < automation.matrix.shape[0] * automation.matrix.shape[1] * 2
+
+
+def test_record_count_after_switching_sparse_off(wide_sheets, make_automation):
+    automation = make_automation(*wide_sheets, sparse=True)
+    automation.build_matrix()
+    automation.sparse = False
+
+    assert automation.record_count() == len(automation.output_data)
+    assert automation.record_count() == automation.matrix.shape[0] * automation.matrix.shape[1] * 2
+
+
+def test_densify_restores_dense_view(wide_sheets, make_automation):
+    dense = make_automation(*wide_sheets).transform_to_tall()
+    automation = make_automation(*wide_sheets, sparse=True)
+    automation.transform_to_tall()
+
+    assert automation.densify_output()[dense.columns].equals(dense)
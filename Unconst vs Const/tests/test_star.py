@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def read_table(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+
+@pytest.fixture(params=['parquet', 'csv'])
+def star(request, tmp_path, wide_sheets, make_automation):
+    """(automation, {table name: DataFrame}) for a dense star schema export"""
+    automation = make_automation(*wide_sheets)
+    automation.build_matrix()
+    paths = automation.save_star_schema(str(tmp_path / 'star'), request.param, chunk_size=500)
+    return automation, {name: read_table(path) for name, path in paths.items()}
+
+
+def test_fact_row_counts(tmp_path, star, wide_sheets, make_automation):
+    automation, tables = star
+    n_rows, n_weeks = automation.matrix.shape
+    assert len(tables['fact_forecast']) == n_rows * n_weeks
+    assert len(tables['dim_helper']) == n_rows
+    assert len(tables['dim_calendar']) == n_weeks
+
+    sparse = make_automation(*wide_sheets, sparse=True)
+    sparse.build_matrix()
+    paths = sparse.save_star_schema(str(tmp_path / 'sparse'), chunk_size=500)
+    assert len(read_table(paths['fact_forecast'])) == sparse.matrix.nonzero_cells().sum()
+
+
+def test_dimension_keys_resolve(star):
+    automation, tables = star
+    fact = tables['fact_forecast']
+    assert fact['Helper ID'].isin(tables['dim_helper']['Helper ID']).all()
+    assert fact['Week ID'].isin(tables['dim_calendar']['Week ID']).all()
+
+    # Fact joined to its dimensions gives back the Constrained rows of the Looker view
+    joined = (fact.merge(tables['dim_helper'], on='Helper ID', validate='many_to_one')
+                  .merge(tables['dim_calendar'], on='Week ID', validate='many_to_one'))
+    tall = automation.output_data
+    constrained = tall[tall['Forecast Type'] == 'Constrained'].reset_index(drop=True)
+    assert joined['Helper'].astype(str).tolist() == constrained['Helper'].tolist()
+    assert joined['Customer'].tolist() == constrained['Customer'].tolist()
+    assert joined['Quarter'].tolist() == constrained['Quarter'].tolist()
+    np.testing.assert_array_equal(joined['Week'], constrained['Week'])
+    np.testing.assert_allclose(joined['Constrained Units'], constrained['Forecast - Units'])
+    np.testing.assert_allclose(joined['Delta - Revenue'], constrained['Delta - Revenue'])
+
+
+def test_no_duplicate_dimension_members(star):
+    _, tables = star
+    helper, calendar = tables['dim_helper'], tables['dim_calendar']
+    assert helper['Helper ID'].is_unique and helper['Helper'].is_unique
+    assert calendar['Week ID'].is_unique and calendar['Week'].is_unique
+    assert not tables['fact_forecast'].duplicated(['Helper ID', 'Week ID']).any()
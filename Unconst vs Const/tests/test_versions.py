@@ -0,0 +1,40 @@
+import numpy as np
+
+from benchmark_forecast_automation import make_wide_sheets
+from conftest import fractional
+from forecast_versions import VersionCube
+
+
+def rolled_versions(make_automation, roll=2):
+    """Two FC versions over the same forecasts, the second one `roll` weeks later"""
+    constrained, unconstrained = fractional(*make_wide_sheets(n_helpers=150, n_weeks=14))
+    weeks = [column for column in constrained.columns if isinstance(column, (int, np.integer))]
+    older = make_automation(constrained.drop(columns=weeks[-roll:]), unconstrained.drop(columns=weeks[-roll:]))
+    newer = make_automation(constrained.drop(columns=weeks[:roll]), unconstrained.drop(columns=weeks[:roll]))
+    return older.build_matrix(), newer.build_matrix()
+
+
+def test_rolled_weeks_are_not_deltas(make_automation):
+    older, newer = rolled_versions(make_automation)
+    cube = VersionCube.from_matrices(['25WK29', '25WK31'], [older, newer])
+
+    assert len(cube.weeks) == 14
+    assert cube.week_present.sum(axis=0).tolist() == [12, 12]
+    assert cube.version_deltas().empty
+    summary = cube.version_summary()
+    assert summary['Gap Units Change'].abs().max() < 1e-6
+    assert summary['Revenue Impact Change'].abs().max() < 1e-6
+
+
+def test_changes_in_shared_weeks_are_deltas(make_automation):
+    older, newer = rolled_versions(make_automation)
+    week = 5                                  # a week both versions cover
+    newer.constrained[10, week] += 7.25
+    cube = VersionCube.from_matrices(['25WK29', '25WK31'], [older, newer])
+
+    deltas = cube.version_deltas()
+    assert len(deltas) == 1
+    row = deltas.iloc[0]
+    assert row['Helper'] == newer.helpers[10]
+    assert row['Week'] == newer.weeks[week]
+    assert row['Constrained Change'] == 7.25